@@ -3,14 +3,9 @@ from sqlalchemy import engine_from_config
 from sqlalchemy import pool
 from alembic import context
 
-import os
-import sys
-
 from app.core.settings import settings
 from app.models import Base
 
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app')))
-
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,141 @@
+"""initial schema
+
+Revision ID: 3f1c2a7d9b10
+Revises:
+Create Date: 2026-10-17 09:12:41.208311
+
+"""
+from typing import List, Sequence, Set, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "3f1c2a7d9b10"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _existing_tables() -> Set[str]:
+    if context.is_offline_mode():
+        return set()
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def _create_index_if_missing(name: str, table: str, columns: List[str], unique: bool) -> None:
+    if not context.is_offline_mode():
+        if name in {index["name"] for index in sa.inspect(op.get_bind()).get_indexes(table)}:
+            return
+    op.create_index(name, table, columns, unique=unique)
+
+
+def upgrade() -> None:
+    # Databases created before the migrations, by Base.metadata.create_all, already
+    # have some of these tables: only the missing tables and indexes are created
+    tables = _existing_tables()
+    if "users" not in tables:
+        op.create_table(
+            "users",
+            sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False, comment="Unique identifier for the user"),
+            sa.Column("username", sa.String(), nullable=False, comment="Username of the user"),
+            sa.Column("email", sa.String(), nullable=False, comment="Email address of the user"),
+            sa.Column("hashed_password", sa.String(), nullable=False, comment="Hashed password of the user"),
+            sa.PrimaryKeyConstraint("id"),
+        )
+    _create_index_if_missing("ix_users_id", "users", ["id"], unique=True)
+    _create_index_if_missing("ix_users_username", "users", ["username"], unique=True)
+    _create_index_if_missing("ix_users_email", "users", ["email"], unique=True)
+
+    if "services" not in tables:
+        op.create_table(
+            "services",
+            sa.Column(
+                "id", postgresql.UUID(as_uuid=True), nullable=False, comment="Unique identifier for the service"
+            ),
+            sa.Column("name", sa.String(), nullable=False, comment="Name of the service"),
+            sa.PrimaryKeyConstraint("id"),
+        )
+    _create_index_if_missing("ix_services_id", "services", ["id"], unique=True)
+    _create_index_if_missing("ix_services_name", "services", ["name"], unique=True)
+
+    if "user_roles" not in tables:
+        op.create_table(
+            "user_roles",
+            sa.Column(
+                "id", postgresql.UUID(as_uuid=True), nullable=False,
+                comment="Unique identifier for the user role association"
+            ),
+            sa.Column("role", sa.String(), nullable=False, comment="Role of the user within the service"),
+            sa.Column(
+                "user_id", postgresql.UUID(as_uuid=True), nullable=False, comment="Foreign key referencing the user"
+            ),
+            sa.Column(
+                "service_id", postgresql.UUID(as_uuid=True), nullable=False,
+                comment="Foreign key referencing the service"
+            ),
+            sa.ForeignKeyConstraint(["service_id"], ["services.id"]),
+            sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint("user_id", "service_id", name="uix_user_service"),
+        )
+    _create_index_if_missing("ix_user_roles_id", "user_roles", ["id"], unique=True)
+
+    if "refresh_tokens" not in tables:
+        op.create_table(
+            "refresh_tokens",
+            sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False, comment="The jti of the refresh token"),
+            sa.Column(
+                "family_id", postgresql.UUID(as_uuid=True), nullable=False,
+                comment="Identifier shared by the tokens rotated from the same login"
+            ),
+            sa.Column(
+                "user_id", postgresql.UUID(as_uuid=True), nullable=False, comment="Foreign key referencing the user"
+            ),
+            sa.Column(
+                "expires_at", sa.DateTime(timezone=True), nullable=False,
+                comment="Expiration time of the refresh token"
+            ),
+            sa.Column(
+                "used_at", sa.DateTime(timezone=True), nullable=True,
+                comment="When the token was exchanged for a new one"
+            ),
+            sa.Column(
+                "revoked_at", sa.DateTime(timezone=True), nullable=True, comment="When the token family was revoked"
+            ),
+            sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("id"),
+        )
+    _create_index_if_missing("ix_refresh_tokens_family_id", "refresh_tokens", ["family_id"], unique=False)
+    _create_index_if_missing("ix_refresh_tokens_expires_at", "refresh_tokens", ["expires_at"], unique=False)
+
+    if "revoked_tokens" not in tables:
+        op.create_table(
+            "revoked_tokens",
+            sa.Column("jti", sa.String(), nullable=False, comment="The jti of the revoked access token"),
+            sa.Column(
+                "expires_at", sa.DateTime(timezone=True), nullable=False,
+                comment="Expiration time of the revoked access token"
+            ),
+            sa.PrimaryKeyConstraint("jti"),
+        )
+    _create_index_if_missing("ix_revoked_tokens_expires_at", "revoked_tokens", ["expires_at"], unique=False)
+
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_revoked_tokens_expires_at"), table_name="revoked_tokens")
+    op.drop_table("revoked_tokens")
+    op.drop_index(op.f("ix_refresh_tokens_expires_at"), table_name="refresh_tokens")
+    op.drop_index(op.f("ix_refresh_tokens_family_id"), table_name="refresh_tokens")
+    op.drop_table("refresh_tokens")
+    op.drop_index(op.f("ix_user_roles_id"), table_name="user_roles")
+    op.drop_table("user_roles")
+    op.drop_index(op.f("ix_services_name"), table_name="services")
+    op.drop_index(op.f("ix_services_id"), table_name="services")
+    op.drop_table("services")
+    op.drop_index(op.f("ix_users_email"), table_name="users")
+    op.drop_index(op.f("ix_users_username"), table_name="users")
+    op.drop_index(op.f("ix_users_id"), table_name="users")
+    op.drop_table("users")
@@ -0,0 +1,32 @@
+"""add user_roles service_id, role index
+
+Revision ID: 8b4e61d0c2f7
+Revises: 3f1c2a7d9b10
+Create Date: 2026-10-17 11:03:27.540918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8b4e61d0c2f7"
+down_revision: Union[str, None] = "3f1c2a7d9b10"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY doesn't lock the table against writes, but can't run in a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_user_roles_service_id_role", "user_roles", ["service_id", "role"], unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_user_roles_service_id_role", table_name="user_roles", postgresql_concurrently=True)
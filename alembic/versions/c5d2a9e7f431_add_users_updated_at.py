@@ -0,0 +1,35 @@
+"""add users updated_at
+
+Revision ID: c5d2a9e7f431
+Revises: 8b4e61d0c2f7
+Create Date: 2026-10-17 13:48:02.114576
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c5d2a9e7f431"
+down_revision: Union[str, None] = "8b4e61d0c2f7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # now() is stable, so the existing rows get the migration time without a table rewrite
+    op.add_column(
+        "users",
+        sa.Column(
+            "updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False,
+            comment="Last change of the user or of their roles, the export watermark"
+        ),
+    )
+    op.create_index(op.f("ix_users_updated_at"), "users", ["updated_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_users_updated_at"), table_name="users")
+    op.drop_column("users", "updated_at")
@@ -0,0 +1,52 @@
+"""add change_events
+
+Revision ID: e91b7c3f5a08
+Revises: c5d2a9e7f431
+Create Date: 2026-10-17 16:25:51.739204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "e91b7c3f5a08"
+down_revision: Union[str, None] = "c5d2a9e7f431"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "change_events",
+        sa.Column(
+            "version", sa.BigInteger().with_variant(sa.Integer(), "sqlite"), autoincrement=True, nullable=False,
+            comment="Position of the change in the feed"
+        ),
+        sa.Column("entity", sa.String(), nullable=False, comment="What changed: user or user_role"),
+        sa.Column(
+            "operation", sa.String(), nullable=False,
+            comment="create or delete for a user, upsert or delete for a user role"
+        ),
+        sa.Column(
+            "user_id", postgresql.UUID(as_uuid=True), nullable=False,
+            comment="The user that changed, not a foreign key so that deletions stay in the feed"
+        ),
+        sa.Column("username", sa.String(), nullable=False, comment="Username of the user"),
+        sa.Column("email", sa.String(), nullable=False, comment="Email address of the user"),
+        sa.Column(
+            "service_id", postgresql.UUID(as_uuid=True), nullable=True, comment="The service of a user role change"
+        ),
+        sa.Column("role", sa.String(), nullable=True, comment="The new role of an upserted user role"),
+        sa.Column(
+            "created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False,
+            comment="When the change was recorded"
+        ),
+        sa.PrimaryKeyConstraint("version"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("change_events")
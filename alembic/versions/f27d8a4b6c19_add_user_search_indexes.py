@@ -0,0 +1,45 @@
+"""add user search indexes
+
+Revision ID: f27d8a4b6c19
+Revises: e91b7c3f5a08
+Create Date: 2026-10-17 19:40:12.385067
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f27d8a4b6c19"
+down_revision: Union[str, None] = "e91b7c3f5a08"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_COLUMNS = ("username", "email")
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # CONCURRENTLY doesn't lock the table against writes, but can't run in a transaction
+    with op.get_context().autocommit_block():
+        for column in SEARCH_COLUMNS:
+            # Prefix search and keyset order, a "C" collation btree serves LIKE 'abc%'
+            # as a range scan like text_pattern_ops, and also the ORDER BY
+            op.execute(
+                f'CREATE INDEX CONCURRENTLY ix_users_{column}_search '
+                f'ON users (lower({column}) COLLATE "C", {column} COLLATE "C")'
+            )
+            # Substring search, LIKE '%abc%'
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY ix_users_{column}_trgm "
+                f"ON users USING gin (lower({column}) gin_trgm_ops)"
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for column in SEARCH_COLUMNS:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS ix_users_{column}_trgm")
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS ix_users_{column}_search")
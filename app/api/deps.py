@@ -1,15 +1,153 @@
+from contextlib import AsyncExitStack, ExitStack, asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, Union
+
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy import create_engine
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
 
+from app.core.db_pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool, pool_status
+from app.core.db_routing import ReplicaRouter, RoutingSession
+from app.core.metrics import instrument_engine
 from app.core.settings import settings
+from app.core.sql_instrumentation import instrument_sql
+
+# Async drivers used when DB_ASYNC is enabled and no ASYNC_DATABASE_URL is given
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+DbSession = Union[Session, AsyncSession]
+
+
+def to_async_url(database_url: str) -> URL:
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+
+def get_async_database_url() -> URL:
+    if settings.ASYNC_DATABASE_URL:
+        return make_url(settings.ASYNC_DATABASE_URL)
+    return to_async_url(settings.DATABASE_URL)
+
+
+POOL_OPTIONS: Dict[str, Any] = {
+    "pool_size": settings.DB_POOL_SIZE,
+    "max_overflow": settings.DB_MAX_OVERFLOW,
+    "pool_timeout": settings.DB_POOL_TIMEOUT,
+    "pool_recycle": settings.DB_POOL_RECYCLE,
+    "pool_pre_ping": settings.DB_POOL_PRE_PING,
+}
+
+
+def instrument(engine: Engine, name: str) -> None:
+    instrument_engine(engine, settings.DB_POOL_SIZE, name)
+    if settings.SQL_INSTRUMENTATION:
+        instrument_sql(engine, name)
+
+
+def create_replica_engine(url: str, name: str) -> Union[Engine, AsyncEngine]:
+    # Same driver, pool and instrumentation as the engine serving the requests
+    if settings.DB_ASYNC:
+        replica: Union[Engine, AsyncEngine] = create_async_engine(
+            to_async_url(url), poolclass=InstrumentedAsyncQueuePool, pool_logging_name=name, **POOL_OPTIONS
+        )
+        instrument(replica.sync_engine, name)
+    else:
+        replica = create_engine(url, poolclass=InstrumentedQueuePool, pool_logging_name=name, **POOL_OPTIONS)
+        instrument(replica, name)
+    return replica
+
+
+replica_router = ReplicaRouter(
+    [create_replica_engine(url, f"replica-{i}") for i, url in enumerate(settings.DB_REPLICA_URLS)],
+    max_lag=settings.DB_REPLICA_MAX_LAG_SECONDS,
+)
 
-engine = create_engine(settings.DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+engine = create_engine(settings.DATABASE_URL, poolclass=InstrumentedQueuePool, **POOL_OPTIONS)
+SessionLocal = sessionmaker(
+    class_=RoutingSession,
+    autocommit=False,
+    autoflush=False,
+    bind=engine,
+    replicas=None if settings.DB_ASYNC else replica_router,
+)
 
+async_engine = create_async_engine(
+    get_async_database_url(), poolclass=InstrumentedAsyncQueuePool, **POOL_OPTIONS
+) if settings.DB_ASYNC else None
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    sync_session_class=RoutingSession,
+    autoflush=False,
+    expire_on_commit=False,
+    replicas=replica_router if settings.DB_ASYNC else None,
+)
 
-def get_db() -> Session:
+# Metrics of the engine serving the requests
+instrument(async_engine.sync_engine if async_engine is not None else engine, "primary")
+
+
+def get_db() -> Iterator[Session]:
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# The session dependency used by the routers, selected by DB_ASYNC
+get_session = get_async_db if settings.DB_ASYNC else get_db
+
+
+@asynccontextmanager
+async def session_scope() -> AsyncIterator[DbSession]:
+    """
+    Opens a session outside of a request, e.g. for a background task.
+    """
+    if settings.DB_ASYNC:
+        async with AsyncSessionLocal() as db:
+            yield db
+    else:
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+
+async def warm_up_pool(connections: int) -> int:
+    """
+    Opens connections of the pool serving the requests ahead of the first requests.
+    They are held at the same time, so that each one is a new connection, and
+    then returned to the pool. At most the pool size is opened, the overflow
+    connections would be closed right away on return.
+
+    :param connections: The number of connections to open.
+    :return: The number of connections opened.
+    """
+    connections = max(0, min(connections, settings.DB_POOL_SIZE))
+    if async_engine is not None:
+        async with AsyncExitStack() as stack:
+            for _ in range(connections):
+                await stack.enter_async_context(async_engine.connect())
+    else:
+        def open_connections() -> None:
+            with ExitStack() as stack:
+                for _ in range(connections):
+                    stack.enter_context(engine.connect())
+
+        await run_in_threadpool(open_connections)
+    return connections
+
+
+def get_pool_status() -> Dict[str, Any]:
+    """
+    Reports the usage of the connection pool serving the requests.
+    """
+    return pool_status(async_engine.pool if async_engine is not None else engine.pool)
@@ -1,12 +1,19 @@
 import logging
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
 
-from app.api.deps import get_db
-from app.core.security import create_access_token
-from app.schemas import Token
+from app.api.deps import DbSession, get_session
+from app.core.rate_limit import login_ip_limiter
+from app.core.security import get_current_admin_user, introspect_tokens, issue_tokens, refresh_tokens, revoke_token
+from app.core.settings import settings
+from app.schemas import (
+    RefreshTokenRequest,
+    Token,
+    TokenIntrospectionRequest,
+    TokenIntrospectionResponse,
+    TokenRevocationRequest,
+)
 from app.services import UserService
 
 router = APIRouter()
@@ -14,20 +21,60 @@ logger = logging.getLogger("auth_service.api.v1.auth")
 
 
 @router.post("/token", response_model=Token)
-def login_for_access_token(
+async def login_for_access_token(
+    request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_session)
 ):
-    logger.info(f"User login attempt: {form_data.username}")
+    logger.info("User login attempt: %s", form_data.username)
+    # Throttle before the password is verified, rejected attempts cost no hashing.
+    # Failed logins are also throttled per user, once the user is resolved (see authenticate_user).
+    # Behind a proxy, run uvicorn with --proxy-headers so that the client IP is the real one.
+    login_ip_limiter.check(request.client.host if request.client else "")
     user_service = UserService(db)
-    user = user_service.authenticate_user(form_data.username, form_data.password)
+    user = await user_service.authenticate_user(form_data.username, form_data.password)
     if not user:
-        logger.warning(f"Invalid user credentials: {form_data.username}")
+        logger.warning("Invalid user credentials: %s", form_data.username)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token = create_access_token(data={"sub": user.username})
-    logger.info(f"User {user.username} has been successfully authenticated.")
-    return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
+    tokens = await issue_tokens(user, db)
+    logger.info("User %s has been successfully authenticated.", user.username)
+    return tokens
+
+
+@router.post("/token/refresh", response_model=Token)
+async def refresh_access_token(request: RefreshTokenRequest, db: DbSession = Depends(get_session)):
+    tokens = await refresh_tokens(request.refresh_token, db)
+    if tokens is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return tokens
+
+
+@router.post("/token/revoke", status_code=status.HTTP_204_NO_CONTENT)
+async def revoke(request: TokenRevocationRequest, db: DbSession = Depends(get_session)):
+    # Like RFC 7009, an invalid or expired token is not an error
+    if await revoke_token(request.token, db):
+        logger.info("A token has been revoked.")
+
+
+@router.post("/token/introspect", response_model=TokenIntrospectionResponse)
+async def introspect(
+    request: TokenIntrospectionRequest,
+    db: DbSession = Depends(get_session),
+    current_user=Depends(get_current_admin_user)
+):
+    if len(request.tokens) > settings.INTROSPECTION_MAX_TOKENS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.INTROSPECTION_MAX_TOKENS} tokens can be introspected at once",
+        )
+    logger.debug("The administrator %s introspects %s tokens.", current_user.username, len(request.tokens))
+    results = await introspect_tokens(request.tokens, db)
+    return {"results": results}
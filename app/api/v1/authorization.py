@@ -0,0 +1,42 @@
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from app.core.security import get_current_admin_user
+from app.core.settings import settings
+from app.crud.role_index import role_index
+from app.schemas import (
+    AuthorizationBatchRequest,
+    AuthorizationBatchResponse,
+    AuthorizationCheck,
+    AuthorizationDecision,
+)
+
+router = APIRouter()
+logger = logging.getLogger("auth_service.api.v1.authorization")
+
+
+def _decide(check: AuthorizationCheck) -> AuthorizationDecision:
+    role = role_index.get_role(check.user_id, check.service_id)
+    allowed = role is not None and (check.role is None or check.role == role)
+    return AuthorizationDecision(allowed=allowed, role=role)
+
+
+@router.post("/authorize", response_model=AuthorizationDecision)
+async def authorize(check: AuthorizationCheck, current_user=Depends(get_current_admin_user)):
+    """
+    Tells whether a user holds a role in a service, or any role when none is given.
+    Answered from the in-memory role index, without a database query.
+    """
+    return _decide(check)
+
+
+@router.post("/authorize/batch", response_model=AuthorizationBatchResponse)
+async def authorize_batch(request: AuthorizationBatchRequest, current_user=Depends(get_current_admin_user)):
+    if len(request.checks) > settings.AUTHORIZATION_MAX_CHECKS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.AUTHORIZATION_MAX_CHECKS} checks can be made at once",
+        )
+    logger.debug("The administrator %s makes %s authorization checks.", current_user.username, len(request.checks))
+    return {"results": [_decide(check) for check in request.checks]}
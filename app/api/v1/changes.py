@@ -0,0 +1,30 @@
+import logging
+
+from fastapi import APIRouter, Depends, Query
+
+from app.api.deps import DbSession, get_session
+from app.core.security import get_current_admin_user
+from app.crud import ChangeRepository
+from app.schemas import ChangeFeed
+
+router = APIRouter()
+logger = logging.getLogger("auth_service.api.v1.changes")
+
+
+@router.get("/changes", response_model=ChangeFeed, response_model_exclude_none=True)
+async def read_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: DbSession = Depends(get_session),
+    current_user=Depends(get_current_admin_user)
+):
+    """
+    Returns the user and role changes recorded after the version `since`, oldest first.
+    Pass next_since as `since` of the next call, until has_more is false.
+    A deleted user also loses all their roles, no separate role deletions are recorded for it.
+    """
+    logger.debug("The administrator %s reads the changes since %s.", current_user.username, since)
+    changes = await ChangeRepository(db).get_changes(since, limit + 1)
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    return {"changes": changes, "next_since": changes[-1].version if changes else since, "has_more": has_more}
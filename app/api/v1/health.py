@@ -0,0 +1,24 @@
+from fastapi import APIRouter, status
+from fastapi.responses import JSONResponse
+
+from app.core.startup import startup_state
+
+router = APIRouter()
+
+
+@router.get("/health", include_in_schema=False)
+async def read_health():
+    """
+    Liveness probe, the process is up and serving.
+    """
+    return {"status": "ok"}
+
+
+@router.get("/ready", include_in_schema=False)
+async def read_readiness():
+    """
+    Readiness probe, fails until the warm-up is done and again while shutting down.
+    """
+    if not startup_state.ready:
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content={"status": "not ready"})
+    return {"status": "ready"}
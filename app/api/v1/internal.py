@@ -0,0 +1,36 @@
+import logging
+
+from fastapi import APIRouter, Depends
+
+from app.api.deps import get_pool_status, replica_router
+from app.core.change_feed import change_follower
+from app.core.hashing import password_hasher
+from app.core.rate_limit import login_ip_limiter, login_username_limiter
+from app.core.revocation import revocation_list
+from app.core.security import get_current_admin_user, token_cache
+from app.core.startup import startup_state
+from app.crud.role_index import role_index
+from app.crud.user_cache import user_cache
+
+router = APIRouter()
+logger = logging.getLogger("auth_service.api.v1.internal")
+
+
+@router.get("/internal/stats")
+def read_internal_stats(current_user=Depends(get_current_admin_user)):
+    logger.debug("The administrator %s requests internal stats.", current_user.username)
+    return {
+        "startup": startup_state.stats(),
+        "db_pool": get_pool_status(),
+        "db_replicas": replica_router.stats(),
+        "user_cache": user_cache.stats(),
+        "token_cache": token_cache.stats(),
+        "revocations": revocation_list.stats(),
+        "role_index": role_index.stats(),
+        "change_feed": change_follower.stats(),
+        "password_hashing": password_hasher.stats(),
+        "login_limits": {
+            "username": login_username_limiter.stats(),
+            "ip": login_ip_limiter.stats(),
+        },
+    }
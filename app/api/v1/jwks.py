@@ -0,0 +1,27 @@
+import logging
+
+from fastapi import APIRouter, Request, Response
+
+from app.core.keys import key_ring
+from app.core.settings import settings
+
+router = APIRouter()
+logger = logging.getLogger("auth_service.api.v1.jwks")
+
+EMPTY_JWKS = b'{"keys":[]}'
+
+
+@router.get("/.well-known/jwks.json")
+async def read_jwks(request: Request):
+    """
+    Serves the public token verification keys, pre-serialized in memory,
+    so that other services can verify tokens locally.
+    """
+    body = key_ring.jwks_json if key_ring is not None else EMPTY_JWKS
+    etag = key_ring.jwks_etag if key_ring is not None else ""
+    headers = {"Cache-Control": f"public, max-age={settings.JWKS_CACHE_MAX_AGE}"}
+    if etag:
+        headers["ETag"] = etag
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -1,12 +1,26 @@
+import json
 import logging
+import uuid
+from datetime import datetime, timedelta, timezone
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import Any, AsyncIterator, List, Optional
 
-from app.api.deps import get_db
+from app.api.deps import DbSession, get_session, session_scope
 from app.core.security import get_current_admin_user
-from app.schemas import User, UserCreate, UserRoleCreate
+from app.core.settings import settings
+from app.crud import SearchTooBroadError
+from app.schemas import (
+    BulkRoleResponse,
+    BulkUserResponse,
+    User,
+    UserCreate,
+    UserPage,
+    UserRoleAssignment,
+    UserRoleCreate,
+    UserServiceRef,
+)
 from app.services import UserService
 
 router = APIRouter()
@@ -14,68 +28,233 @@ logger = logging.getLogger("auth_service.api.v1.users")
 
 
 @router.post("/users/", response_model=User)
-def create_user(
+async def create_user(
     user: UserCreate,
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_session),
     current_user=Depends(get_current_admin_user)
 ):
-    logger.info(f"The administrator {current_user.username} creates a user: {user.username}")
+    logger.info("The administrator %s creates a user: %s", current_user.username, user.username)
     user_service = UserService(db)
-    existing_user = user_service.get_user_by_username(user.username)
+    existing_user = await user_service.get_user_snapshot_by_username(user.username)
     if existing_user:
-        logger.warning(f"The user {user.username} already exists.")
+        logger.warning("The user %s already exists.", user.username)
         raise HTTPException(status_code=400, detail="The user already exists")
-    created_user = user_service.create_user(user)
-    logger.info(f"The user {created_user.username} was successfully created.")
+    created_user = await user_service.create_user(user)
+    logger.info("The user %s was successfully created.", created_user.username)
     return created_user
 
 
-@router.get("/users/", response_model=List[User])
-def read_users(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
+async def _iter_ndjson(request: Request) -> AsyncIterator[bytes]:
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
+
+async def _iter_list(items: list) -> AsyncIterator[Any]:
+    for item in items:
+        yield item
+
+
+@router.post("/users/bulk", response_model=BulkUserResponse)
+async def create_users_bulk(
+    request: Request,
+    db: DbSession = Depends(get_session),
+    current_user=Depends(get_current_admin_user)
+):
+    """
+    Creates users in bulk from a JSON list of UserCreate,
+    or from an NDJSON stream (Content-Type: application/x-ndjson) which is processed as it arrives.
+    """
+    logger.info("The administrator %s creates users in bulk.", current_user.username)
+    if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+        items = _iter_ndjson(request)
+    else:
+        try:
+            body = await request.json()
+        except json.JSONDecodeError:
+            raise HTTPException(status_code=400, detail="The request body is not valid JSON")
+        if not isinstance(body, list):
+            raise HTTPException(status_code=400, detail="Expected a list of users")
+        items = _iter_list(body)
+    user_service = UserService(db)
+    response = await user_service.bulk_create_users(items)
+    logger.info(
+        "Bulk creation finished: %s created, %s skipped, %s failed.",
+        response.created, response.skipped, response.failed
+    )
+    return response
+
+
+@router.get("/users/", response_model=UserPage)
+async def read_users(
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    db: DbSession = Depends(get_session),
     current_user=Depends(get_current_admin_user)
 ):
     logger.info(
-        f"The administrator {current_user.username} requests a list of users. Pass: {skip}, Limit: {limit}"
+        "The administrator %s requests a list of users. Cursor: %s, Limit: %s", current_user.username, cursor, limit
     )
     user_service = UserService(db)
-    users = user_service.get_users(skip=skip, limit=limit)
-    logger.info(f"Returned by {len(users)} users.")
-    return users
+    try:
+        users, next_cursor = await user_service.get_users(limit=limit, cursor=cursor)
+    except ValueError:
+        logger.warning("Invalid pagination cursor: %s", cursor)
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    logger.info("Returned by %s users.", len(users))
+    return {"items": users, "next_cursor": next_cursor}
+
+
+# Shorter substrings have no trigram to look up and would scan the whole table
+MIN_SUBSTRING_LENGTH = 3
+
+
+@router.get("/users/search", response_model=UserPage)
+async def search_users(
+    q: str = Query(..., min_length=1, max_length=254),
+    field: str = Query("username", pattern="^(username|email)$"),
+    mode: str = Query("prefix", pattern="^(prefix|contains)$"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: DbSession = Depends(get_session),
+    current_user=Depends(get_current_admin_user)
+):
+    """
+    Finds users whose username or email starts with (prefix) or contains q, ignoring case.
+    A substring matching more than USER_SEARCH_MAX_CANDIDATES users is refused, as too broad.
+    """
+    logger.info("The administrator %s searches users by %s %s '%s'.", current_user.username, field, mode, q)
+    if mode == "contains" and len(q) < MIN_SUBSTRING_LENGTH:
+        raise HTTPException(
+            status_code=400, detail=f"A substring search needs at least {MIN_SUBSTRING_LENGTH} characters"
+        )
+    user_service = UserService(db)
+    try:
+        users, next_cursor = await user_service.search_users(q, field=field, mode=mode, limit=limit, cursor=cursor)
+    except ValueError:
+        logger.warning("Invalid pagination cursor: %s", cursor)
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    except SearchTooBroadError as e:
+        logger.info("Search by %s %s '%s' refused: %s", field, mode, q, e)
+        raise HTTPException(status_code=400, detail=f"{e}, search for a longer substring")
+    return {"items": users, "next_cursor": next_cursor}
+
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+async def _export_users(
+    export_format: str, service_id: Optional[uuid.UUID], updated_since: Optional[datetime]
+) -> AsyncIterator[bytes]:
+    # The request's session is closed before the body is streamed, the export has its own
+    async with session_scope() as db:
+        async for chunk in UserService(db).export_users(export_format, service_id, updated_since):
+            yield chunk
+
+
+@router.get("/users/export")
+async def export_users(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    service_id: Optional[uuid.UUID] = None,
+    updated_since: Optional[datetime] = None,
+    current_user=Depends(get_current_admin_user)
+):
+    """
+    Streams all the users with their roles as NDJSON or CSV, read through a
+    server-side cursor so that the memory use doesn't grow with the number of users.
+    Filter by service, and by updated_since to export only the users changed since the last run.
+
+    For the next run, pass the X-Next-Updated-Since header of this response as
+    updated_since rather than the time of the last exported change: updated_at
+    is set when the writing transaction starts, not when it commits, and the
+    export may read a lagging replica, so the header starts
+    EXPORT_WATERMARK_OVERLAP_SECONDS before this export. The users changed in
+    that window are exported again, consumers upsert them by id.
+    """
+    logger.info(
+        "The administrator %s exports users as %s. Service: %s, updated since: %s",
+        current_user.username, format, service_id, updated_since
+    )
+    next_updated_since = datetime.now(timezone.utc) - timedelta(seconds=settings.EXPORT_WATERMARK_OVERLAP_SECONDS)
+    return StreamingResponse(
+        _export_users(format, service_id, updated_since),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="users.{format}"',
+            "X-Next-Updated-Since": next_updated_since.isoformat(),
+        },
+    )
 
 
 @router.delete("/users/{username}", response_model=User)
-def delete_user(
+async def delete_user(
     username: str,
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_session),
     current_user=Depends(get_current_admin_user)
 ):
-    logger.info(f"The administrator {current_user.username} deletes the user: {username}")
+    logger.info("The administrator %s deletes the user: %s", current_user.username, username)
     user_service = UserService(db)
-    user = user_service.delete_user(username)
+    user = await user_service.delete_user(username)
     if not user:
-        logger.warning(f"The user {username} was not found to be deleted.")
+        logger.warning("The user %s was not found to be deleted.", username)
         raise HTTPException(status_code=404, detail="The user was not found")
-    logger.info(f"User {username} has been successfully deleted.")
+    logger.info("User %s has been successfully deleted.", username)
     return user
 
 
 @router.post("/users/{username}/roles/", response_model=UserRoleCreate)
-def add_user_role(
+async def add_user_role(
     username: str,
     role: UserRoleCreate,
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_session),
     current_user=Depends(get_current_admin_user)
 ):
-    logger.info(f"The administrator {current_user.username} adds a role for the user: {username}")
+    logger.info("The administrator %s adds a role for the user: %s", current_user.username, username)
     user_service = UserService(db)
-    added_role = user_service.add_user_role(username, role)
+    added_role = await user_service.add_user_role(username, role)
     if not added_role:
-        logger.warning(f"Failed to add the role {role.role} to the user {username}.")
+        logger.warning("Failed to add the role %s to the user %s.", role.role, username)
         raise HTTPException(status_code=404, detail="The user or service was not found")
     logger.info(
-        f"The role {added_role.role} for the service ID {added_role.service_id} has been added to the user {username}."
+        "The role %s for the service ID %s has been added to the user %s.",
+        added_role.role, added_role.service_id, username
     )
     return added_role
+
+
+@router.post("/users/roles/bulk", response_model=BulkRoleResponse)
+async def assign_roles_bulk(
+    assignments: List[UserRoleAssignment],
+    db: DbSession = Depends(get_session),
+    current_user=Depends(get_current_admin_user)
+):
+    logger.info("The administrator %s assigns %s roles in bulk.", current_user.username, len(assignments))
+    user_service = UserService(db)
+    summary = await user_service.bulk_assign_roles(assignments)
+    logger.info(
+        "Bulk role assignment finished: %s of %s applied, %s unknown users, %s unknown services.",
+        summary.applied, summary.requested, len(summary.unknown_users), len(summary.unknown_services)
+    )
+    return summary
+
+
+@router.post("/users/roles/bulk/revoke", response_model=BulkRoleResponse)
+async def revoke_roles_bulk(
+    refs: List[UserServiceRef],
+    db: DbSession = Depends(get_session),
+    current_user=Depends(get_current_admin_user)
+):
+    logger.info("The administrator %s revokes %s roles in bulk.", current_user.username, len(refs))
+    user_service = UserService(db)
+    summary = await user_service.bulk_revoke_roles(refs)
+    logger.info(
+        "Bulk role revocation finished: %s of %s revoked, %s unknown users, %s unknown services.",
+        summary.applied, summary.requested, len(summary.unknown_users), len(summary.unknown_services)
+    )
+    return summary
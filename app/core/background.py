@@ -0,0 +1,36 @@
+import asyncio
+import logging
+from typing import Coroutine, Set
+
+logger = logging.getLogger("auth_service.core.background")
+
+# Strong references to the running tasks, the event loop only keeps weak ones
+_tasks: Set[asyncio.Task] = set()
+
+
+def _on_task_done(task: asyncio.Task) -> None:
+    _tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Background task %s failed: %s", task.get_name(), task.exception())
+
+
+def run_in_background(coro: Coroutine, name: str) -> asyncio.Task:
+    """
+    Runs a coroutine as a fire-and-forget task of the current event loop.
+
+    :param coro: The coroutine to run.
+    :param name: Name of the task, used in the logs.
+    :return: The task.
+    """
+    task = asyncio.get_running_loop().create_task(coro, name=name)
+    _tasks.add(task)
+    task.add_done_callback(_on_task_done)
+    return task
+
+
+def cancel_background_tasks() -> None:
+    """
+    Cancels the background tasks still running, e.g. the periodic ones on shutdown.
+    """
+    for task in list(_tasks):
+        task.cancel()
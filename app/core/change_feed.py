@@ -0,0 +1,144 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from app import models
+from app.api.deps import engine, session_scope
+from app.core.settings import settings
+from app.crud import ChangeRepository
+from app.crud.change_crud import CHANGES_CHANNEL
+from app.crud.role_index import role_index
+from app.crud.user_cache import invalidate_user
+
+logger = logging.getLogger("auth_service.core.change_feed")
+
+# Changes read from the feed per query while catching up
+CATCH_UP_BATCH_SIZE = 1000
+
+
+class ChangeFollower:
+    """
+    Follows the change feed to keep the in-process caches of this worker in
+    line with the changes made by the other workers and replicas: the user
+    cache entries of changed users are dropped and the role changes applied
+    to the role index.
+
+    The feed is read every poll interval, and right away when a Postgres
+    NOTIFY arrives if listening is enabled. Notifications only wake the
+    follower up, the changes are always read from the feed, so a missed
+    notification is caught up by the next read.
+    """
+    def __init__(self, listen: bool):
+        self.listen = listen and engine.dialect.name == "postgresql"
+        self.version = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._connection: Optional[Any] = None
+        self._applied = 0
+        self._notifications = 0
+
+    async def start(self) -> None:
+        """
+        Starts following from the latest change. Meant to run before the caches are loaded.
+        """
+        async with session_scope() as db:
+            self.version = await ChangeRepository(db).get_latest_version()
+
+    def apply(self, changes: List[models.ChangeEvent]) -> None:
+        for change in changes:
+            invalidate_user(change.username, change.email)
+            if change.entity == "user" and change.operation == "delete":
+                role_index.remove_user(change.user_id)
+            elif change.entity == "user_role":
+                role = change.role if change.operation == "upsert" else None
+                role_index.set_roles([(change.user_id, change.service_id, role)])
+            self.version = change.version
+        self._applied += len(changes)
+
+    async def catch_up(self) -> None:
+        """
+        Reads and applies the changes recorded since the last one applied.
+        """
+        async with session_scope() as db:
+            change_repo = ChangeRepository(db)
+            while True:
+                changes = await change_repo.get_changes(self.version, CATCH_UP_BATCH_SIZE)
+                self.apply(changes)
+                if len(changes) < CATCH_UP_BATCH_SIZE:
+                    break
+        logger.debug("Caught up with the change feed at version %s.", self.version)
+
+    def _connect(self) -> Any:
+        # A dedicated psycopg2 connection outside of the pool, LISTEN keeps it for the life of the worker
+        cargs, cparams = engine.dialect.create_connect_args(engine.url)
+        connection = engine.dialect.connect(*cargs, **cparams)
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute(f"LISTEN {CHANGES_CHANNEL}")
+        return connection
+
+    async def _start_listening(self) -> None:
+        try:
+            connection = await run_in_threadpool(self._connect)
+        except Exception as e:
+            logger.error("Failed to listen for changes, polling only: %s", e)
+            return
+        self._connection = connection
+        asyncio.get_running_loop().add_reader(connection.fileno(), self._on_notify)
+        logger.info("Listening for changes on channel %s.", CHANGES_CHANNEL)
+        # Changes committed while the connection was down were not notified
+        self._wakeup.set()
+
+    def _stop_listening(self) -> None:
+        if self._connection is not None:
+            asyncio.get_running_loop().remove_reader(self._connection.fileno())
+            self._connection.close()
+            self._connection = None
+
+    def _on_notify(self) -> None:
+        try:
+            self._connection.poll()
+        except Exception as e:
+            logger.error("Lost the change notifications connection: %s", e)
+            self._stop_listening()
+            return
+        if self._connection.notifies:
+            self._notifications += len(self._connection.notifies)
+            self._connection.notifies.clear()
+            self._wakeup.set()
+
+    async def run(self, poll_interval: float) -> None:
+        """
+        Follows the feed until cancelled.
+
+        :param poll_interval: Seconds between two reads of the feed without a notification.
+        """
+        self._wakeup = asyncio.Event()
+        try:
+            while True:
+                if self.listen and self._connection is None:
+                    await self._start_listening()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                # Notifications arriving during the read wake up the next one
+                self._wakeup.clear()
+                try:
+                    await self.catch_up()
+                except Exception as e:
+                    logger.error("Failed to read the change feed: %s", e)
+        finally:
+            self._stop_listening()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "applied": self._applied,
+            "listening": self._connection is not None,
+            "notifications": self._notifications,
+        }
+
+
+change_follower = ChangeFollower(listen=settings.CHANGE_FEED_LISTEN)
@@ -0,0 +1,93 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Dict
+
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+from app.core.metrics import DB_POOL_CHECKOUT_WAIT
+
+# Number of recent checkout wait times kept for the percentiles
+WAIT_SAMPLES = 2048
+
+
+class WaitTimeTracker:
+    """
+    Keeps the most recent connection checkout wait times and reports their percentiles.
+    """
+    def __init__(self, maxlen: int = WAIT_SAMPLES):
+        self._samples: deque = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+        self.total = 0
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+            self.total += 1
+
+    def percentiles(self) -> Dict[str, float]:
+        """
+        Returns the p50/p95/p99/max wait times in milliseconds.
+        """
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+
+        def pick(q: float) -> float:
+            return samples[min(len(samples) - 1, int(q * len(samples)))] * 1000
+
+        return {"p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99), "max_ms": samples[-1] * 1000}
+
+
+class _TimedCheckoutMixin:
+    """
+    Measures how long each connection checkout waits for a free pool slot.
+    The metrics are labelled with the pool's logging name (pool_logging_name), "primary" without one.
+    """
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.wait_times = WaitTimeTracker()
+        self._checkout_wait = DB_POOL_CHECKOUT_WAIT.labels(getattr(self, "logging_name", None) or "primary")
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - started
+            self.wait_times.record(waited)
+            self._checkout_wait.observe(waited)
+
+
+class InstrumentedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_status(pool: Pool) -> Dict[str, Any]:
+    """
+    Reports the usage of a connection pool.
+
+    :param pool: The engine's connection pool.
+    :return: Dictionary with the checked-out, idle and overflow connections and the checkout wait times.
+    """
+    if not isinstance(pool, QueuePool):
+        return {"pool": type(pool).__name__}
+    status: Dict[str, Any] = {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        # QueuePool counts the overflow from -pool_size until the pool is full
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": pool._max_overflow,
+    }
+    wait_times = getattr(pool, "wait_times", None)
+    if wait_times is not None:
+        status["checkouts"] = wait_times.total
+        status["wait"] = wait_times.percentiles()
+    return status
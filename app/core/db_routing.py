@@ -0,0 +1,161 @@
+import asyncio
+import itertools
+import logging
+import time
+from typing import Any, Dict, List, Optional, Union
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session
+
+from app.core.db_pool import pool_status
+
+logger = logging.getLogger("auth_service.core.db_routing")
+
+# Seconds a replica is behind the primary, 0 when it replayed all it received.
+# NULL = NULL on a server that is not in recovery, which is then never lagging.
+REPLICA_LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class ReplicaRouter:
+    """
+    The read replicas, picked in turn among the healthy ones.
+
+    A replica is healthy when it answers the periodic health check and lags
+    less than max_lag seconds behind the primary. A replica dropping a
+    connection is taken out at once, until the next successful check.
+    """
+    def __init__(self, engines: List[Union[Engine, AsyncEngine]], max_lag: float):
+        self.engines = engines
+        self.max_lag = max_lag
+        self._binds = [e.sync_engine if isinstance(e, AsyncEngine) else e for e in engines]
+        self._healthy: List[Engine] = list(self._binds)
+        self._lag: Dict[int, Optional[float]] = {i: None for i in range(len(engines))}
+        self._counter = itertools.count()
+        self.checked_at = 0.0
+        for bind in self._binds:
+            event.listen(bind, "handle_error", self._on_error)
+
+    def __bool__(self) -> bool:
+        return bool(self.engines)
+
+    def pick(self) -> Optional[Engine]:
+        """
+        Returns the next healthy replica, None if there is none.
+        """
+        healthy = self._healthy
+        if not healthy:
+            return None
+        return healthy[next(self._counter) % len(healthy)]
+
+    def _on_error(self, context: Any) -> None:
+        if context.is_disconnect:
+            bind = context.engine
+            if bind in self._healthy:
+                self._healthy = [b for b in self._healthy if b is not bind]
+                logger.warning("Read replica %s lost its connection, taken out of rotation.", bind.url.host)
+
+    def _check_sync(self, engine: Engine) -> float:
+        with engine.connect() as connection:
+            if engine.dialect.name != "postgresql":
+                connection.execute(text("SELECT 1"))
+                return 0.0
+            return float(connection.execute(REPLICA_LAG_QUERY).scalar())
+
+    async def _check(self, engine: Union[Engine, AsyncEngine]) -> float:
+        if isinstance(engine, AsyncEngine):
+            async with engine.connect() as connection:
+                if engine.dialect.name != "postgresql":
+                    await connection.execute(text("SELECT 1"))
+                    return 0.0
+                return float((await connection.execute(REPLICA_LAG_QUERY)).scalar())
+        return await run_in_threadpool(self._check_sync, engine)
+
+    async def check(self) -> None:
+        """
+        Checks all the replicas at once and updates the rotation.
+        """
+        results = await asyncio.gather(*(self._check(engine) for engine in self.engines), return_exceptions=True)
+        healthy = []
+        for i, (bind, result) in enumerate(zip(self._binds, results)):
+            if isinstance(result, BaseException):
+                self._lag[i] = None
+                logger.warning("Read replica %s failed its health check: %s", bind.url.host, result)
+                continue
+            self._lag[i] = result
+            if result > self.max_lag:
+                logger.warning("Read replica %s lags %.1f seconds behind, out of rotation.", bind.url.host, result)
+                continue
+            healthy.append(bind)
+        if len(healthy) != len(self._healthy):
+            logger.info("%s of %s read replicas in rotation.", len(healthy), len(self._binds))
+        self._healthy = healthy
+        self.checked_at = time.time()
+
+    async def check_periodically(self, interval: float) -> None:
+        """
+        Checks the replicas every interval seconds.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.check()
+            except Exception as e:
+                logger.error("Failed to check the read replicas: %s", e)
+
+    async def dispose(self) -> None:
+        for engine in self.engines:
+            if isinstance(engine, AsyncEngine):
+                await engine.dispose()
+            else:
+                engine.dispose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "replicas": [
+                {
+                    "name": getattr(bind.pool, "logging_name", None),
+                    "host": bind.url.host,
+                    "healthy": bind in self._healthy,
+                    "lag_seconds": self._lag[i],
+                    "pool": pool_status(bind.pool),
+                }
+                for i, bind in enumerate(self._binds)
+            ],
+            "checked_seconds_ago": time.time() - self.checked_at if self.checked_at else None,
+        }
+
+
+class RoutingSession(Session):
+    """
+    Session sending the reads of the repository methods marked for replicas
+    (info["replica"], see BaseRepository) to a read replica, everything else
+    to the primary.
+
+    Once the session has written, all its reads stay on the primary, so that
+    a request reads its own writes, e.g. the user loaded right after its creation.
+    """
+    def __init__(self, *args: Any, replicas: Optional[ReplicaRouter] = None, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+        self._wrote = False
+
+    def get_bind(self, mapper: Any = None, *, clause: Any = None, **kw: Any) -> Any:
+        if self._flushing or (clause is not None and clause.is_dml):
+            self._wrote = True
+        elif (
+            self.replicas
+            and self.info.get("replica")
+            and not self._wrote
+            and clause is not None
+            and clause.is_select
+        ):
+            replica = self.replicas.pick()
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper, clause=clause, **kw)
@@ -0,0 +1,231 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from passlib.context import CryptContext
+
+from app.core.metrics import PASSWORD_HASH_DURATION, PASSWORD_HASH_REJECTED
+from app.core.settings import settings
+
+logger = logging.getLogger("auth_service.core.hashing")
+
+
+def build_crypt_context(
+    schemes: Sequence[str],
+    bcrypt_rounds: int,
+    argon2_time_cost: int,
+    argon2_memory_cost: int,
+    argon2_parallelism: int,
+) -> CryptContext:
+    """
+    Builds a password hashing context.
+    The first scheme hashes new passwords. A hash needs an update when it uses
+    another scheme, fewer bcrypt rounds, or other argon2 parameters.
+
+    :param schemes: The accepted schemes, the preferred one first.
+    :param bcrypt_rounds: The bcrypt cost (log2 of the rounds).
+    :param argon2_time_cost: The argon2 number of iterations.
+    :param argon2_memory_cost: The argon2 memory in KiB.
+    :param argon2_parallelism: The argon2 number of lanes.
+    :return: The CryptContext.
+    """
+    return CryptContext(
+        schemes=list(schemes),
+        deprecated="auto",
+        bcrypt__rounds=bcrypt_rounds,
+        bcrypt__min_desired_rounds=bcrypt_rounds,
+        argon2__time_cost=argon2_time_cost,
+        argon2__memory_cost=argon2_memory_cost,
+        argon2__parallelism=argon2_parallelism,
+    )
+
+
+# Initialize the password hashing context from the configured policy
+pwd_context = build_crypt_context(
+    schemes=settings.PASSWORD_HASH_SCHEMES,
+    bcrypt_rounds=settings.BCRYPT_ROUNDS,
+    argon2_time_cost=settings.ARGON2_TIME_COST,
+    argon2_memory_cost=settings.ARGON2_MEMORY_COST,
+    argon2_parallelism=settings.ARGON2_PARALLELISM,
+)
+
+
+def _hash_password(password: str) -> str:
+    # Module-level so that it can be pickled into a process pool worker.
+    return pwd_context.hash(password)
+
+
+def _verify_password(password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(password, hashed_password)
+
+
+def _verify_password_and_check_policy(password: str, hashed_password: str) -> Tuple[bool, bool]:
+    # Like CryptContext.verify_and_update, but the new hash is left to the caller
+    # so that computing it doesn't slow down the verification.
+    if not pwd_context.verify(password, hashed_password):
+        return False, False
+    return True, pwd_context.needs_update(hashed_password)
+
+
+def _load_backends() -> None:
+    # passlib loads the bcrypt/argon2 backends on the first use, per process
+    for scheme in pwd_context.schemes():
+        handler = pwd_context.handler(scheme)
+        if hasattr(handler, "get_backend"):
+            handler.get_backend()
+
+
+class HashingQueueFullError(Exception):
+    """
+    Raised when the password hashing pool already has too many pending jobs.
+    """
+
+
+class PasswordHasher:
+    """
+    Runs password hashing and verification in a bounded worker pool.
+    Keeps the CPU-heavy hashing off the event loop and rejects new jobs
+    instead of queueing them without limit.
+    """
+    def __init__(self, executor_type: str = "thread", max_workers: int = 1, max_pending: int = 64):
+        if executor_type not in ("thread", "process"):
+            raise ValueError(f"Unknown password hashing executor type: {executor_type}")
+        self.executor_type = executor_type
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+        self._calls = 0
+        self._rejected = 0
+        self._total_seconds = 0.0
+        self._max_seconds = 0.0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="password-hasher"
+                )
+            logger.info(
+                "Started %s pool with %s workers for password hashing.", self.executor_type, self.max_workers
+            )
+        return self._executor
+
+    async def _submit(self, operation: str, func: Callable[..., Any], *args: Any) -> Any:
+        # The counter is only touched from the event loop thread, so no lock is needed.
+        if self._pending >= self.max_pending:
+            self._rejected += 1
+            PASSWORD_HASH_REJECTED.inc()
+            logger.warning("Password %s rejected: %s jobs already pending.", operation, self._pending)
+            raise HashingQueueFullError("Too many pending password hashing jobs")
+        return await self._run(operation, func, *args)
+
+    async def _run(self, operation: str, func: Callable[..., Any], *args: Any) -> Any:
+        self._pending += 1
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self._pending -= 1
+            elapsed = time.perf_counter() - started
+            self._calls += 1
+            self._total_seconds += elapsed
+            self._max_seconds = max(self._max_seconds, elapsed)
+            PASSWORD_HASH_DURATION.labels(operation).observe(elapsed)
+            logger.debug("Password %s took %.1f ms, %s jobs pending.", operation, elapsed * 1000, self._pending)
+
+    async def hash(self, password: str) -> str:
+        """
+        Hashes a password in the worker pool.
+
+        :param password: The plaintext password to hash.
+        :return: The password hash.
+        :raises HashingQueueFullError: If too many jobs are already pending.
+        """
+        return await self._submit("hash", _hash_password, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        """
+        Verifies a password against its hash in the worker pool.
+
+        :param password: The plaintext password to verify.
+        :param hashed_password: The stored password hash.
+        :return: True if the password matches, else False.
+        :raises HashingQueueFullError: If too many jobs are already pending.
+        """
+        return await self._submit("verify", _verify_password, password, hashed_password)
+
+    async def verify_and_check_policy(self, password: str, hashed_password: str) -> Tuple[bool, bool]:
+        """
+        Verifies a password against its hash in the worker pool and tells
+        whether the hash should be replaced to follow the hashing policy.
+
+        :param password: The plaintext password to verify.
+        :param hashed_password: The stored password hash.
+        :return: Whether the password matches, and whether the hash needs an update.
+        :raises HashingQueueFullError: If too many jobs are already pending.
+        """
+        return await self._submit("verify", _verify_password_and_check_policy, password, hashed_password)
+
+    async def hash_many(self, passwords: List[str]) -> List[str]:
+        """
+        Hashes many passwords in parallel across the pool workers.
+        At most one job per worker is in flight at a time, so a bulk import is
+        never rejected and leaves room in the queue for interactive logins.
+
+        :param passwords: The plaintext passwords to hash.
+        :return: The password hashes, in the same order.
+        """
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def hash_one(password: str) -> str:
+            async with semaphore:
+                return await self._run("hash", _hash_password, password)
+
+        return list(await asyncio.gather(*(hash_one(password) for password in passwords)))
+
+    async def warm_up(self) -> None:
+        """
+        Starts the pool workers and loads the hashing backends in them,
+        so that the first logins don't pay for it.
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        await asyncio.gather(*(loop.run_in_executor(executor, _load_backends) for _ in range(self.max_workers)))
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the pool usage and per-call timing counters.
+        """
+        return {
+            "executor": self.executor_type,
+            "workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+            "calls": self._calls,
+            "rejected": self._rejected,
+            "avg_ms": (self._total_seconds / self._calls * 1000) if self._calls else 0.0,
+            "max_ms": self._max_seconds * 1000,
+        }
+
+    def shutdown(self) -> None:
+        """
+        Stops the worker pool.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            logger.info("Password hashing pool stopped.")
+
+
+password_hasher = PasswordHasher(
+    executor_type=settings.PASSWORD_HASH_EXECUTOR,
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
@@ -0,0 +1,164 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from jose import jwk
+from jose.backends.base import Key
+
+from app.core.settings import settings
+
+logger = logging.getLogger("auth_service.core.keys")
+
+ASYMMETRIC_ALGORITHMS = ("RS256", "RS384", "RS512", "ES256", "ES384", "ES512")
+
+
+@dataclass(frozen=True)
+class SigningKey:
+    """
+    A token signing key with its key id.
+    The parsed key objects are kept so that signing and verifying never re-parse the PEM.
+    """
+    kid: str
+    private_key: Key
+    public_key: Key
+    public_jwk: Dict[str, Any]
+
+
+class KeyRing:
+    """
+    Token signing keys read from a directory of PEM private keys named <kid>.pem.
+
+    The active key signs new tokens. Every other key is only used to verify
+    tokens and is published in the JWKS. A new key file is published at once
+    but signs only once it is activation_delay seconds old, by when the
+    consumers caching the JWKS have fetched it. A key that disappears from the
+    directory stays in memory for the retention period (the longest token
+    lifetime, refresh tokens included), so the tokens it signed remain valid
+    until they expire.
+    """
+    def __init__(
+        self,
+        algorithm: str,
+        keys_dir: str,
+        active_kid: Optional[str],
+        retention_seconds: float,
+        activation_delay: float = 0.0,
+    ):
+        self.algorithm = algorithm
+        self.keys_dir = keys_dir
+        self.active_kid = active_kid
+        self.retention_seconds = retention_seconds
+        self.activation_delay = activation_delay
+        self._keys: Dict[str, SigningKey] = {}
+        self._retired: Dict[str, float] = {}
+        self._signing_kid: Optional[str] = None
+        self._lock = threading.Lock()
+        self.jwks_json: bytes = b'{"keys":[]}'
+        self.jwks_etag: str = ""
+
+    def _load_key(self, kid: str, pem: str) -> SigningKey:
+        private_key = jwk.construct(pem, self.algorithm)
+        public_key = private_key.public_key()
+        public_jwk = {**public_key.to_dict(), "kid": kid, "use": "sig", "alg": self.algorithm}
+        return SigningKey(kid=kid, private_key=private_key, public_key=public_key, public_jwk=public_jwk)
+
+    def reload(self) -> None:
+        """
+        Re-reads the key directory, picks the signing key and rebuilds the serialized JWKS.
+        Keys that are gone from the directory are dropped once their retention period is over.
+        """
+        now = time.time()
+        found: Dict[str, float] = {}
+        if os.path.isdir(self.keys_dir):
+            for name in os.listdir(self.keys_dir):
+                if name.endswith(".pem"):
+                    found[name[:-len(".pem")]] = os.path.getmtime(os.path.join(self.keys_dir, name))
+
+        with self._lock:
+            for kid in found:
+                if kid not in self._keys:
+                    with open(os.path.join(self.keys_dir, f"{kid}.pem")) as f:
+                        self._keys[kid] = self._load_key(kid, f.read())
+                    wait = found[kid] + self.activation_delay - now
+                    if wait > 0 and not self.active_kid:
+                        logger.info("Loaded token signing key '%s', it signs in %.0f seconds.", kid, wait)
+                    else:
+                        logger.info("Loaded token signing key '%s'.", kid)
+                self._retired.pop(kid, None)
+            for kid in list(self._keys):
+                if kid in found:
+                    continue
+                retired_at = self._retired.setdefault(kid, now)
+                if now - retired_at > self.retention_seconds:
+                    del self._keys[kid]
+                    del self._retired[kid]
+                    logger.info("Dropped retired token signing key '%s'.", kid)
+
+            if self.active_kid:
+                signing_kid = self.active_kid if self.active_kid in found else None
+            else:
+                # Without an explicit active key, the newest key file published for long enough signs.
+                # When none is, e.g. on the very first start, nobody has cached the JWKS yet.
+                published = {kid: mtime for kid, mtime in found.items() if now - mtime >= self.activation_delay}
+                candidates = published or found
+                signing_kid = max(candidates, key=candidates.get) if candidates else None
+            if signing_kid is None:
+                raise RuntimeError(f"No signing key found in {self.keys_dir} for {self.algorithm}")
+            if signing_kid != self._signing_kid:
+                logger.info("Token signing key is now '%s'.", signing_kid)
+            self._signing_kid = signing_kid
+
+            jwks = {"keys": [key.public_jwk for key in self._keys.values()]}
+            self.jwks_json = json.dumps(jwks, separators=(",", ":"), sort_keys=True).encode("utf-8")
+            self.jwks_etag = '"' + hashlib.sha256(self.jwks_json).hexdigest()[:32] + '"'
+
+    def signing_key(self) -> SigningKey:
+        """
+        Returns the key that signs new tokens.
+        """
+        if self._signing_kid is None:
+            self.reload()
+        return self._keys[self._signing_kid]
+
+    def verification_key(self, kid: Optional[str]) -> Optional[SigningKey]:
+        """
+        Returns the key with the given key id, None if it is unknown or retired.
+        """
+        if self._signing_kid is None:
+            self.reload()
+        return self._keys.get(kid) if kid else None
+
+    def kids(self) -> List[str]:
+        return list(self._keys)
+
+    async def reload_periodically(self, interval: float) -> None:
+        """
+        Re-reads the key directory every interval seconds, picking up rotated keys.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await run_in_threadpool(self.reload)
+            except Exception as e:
+                logger.error("Failed to reload the token signing keys: %s", e)
+
+
+key_ring: Optional[KeyRing] = KeyRing(
+    algorithm=settings.ALGORITHM,
+    keys_dir=settings.JWT_KEYS_DIR,
+    active_kid=settings.JWT_ACTIVE_KID,
+    # Refresh tokens are signed with the same keys and outlive the access tokens
+    retention_seconds=max(settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60, settings.REFRESH_TOKEN_EXPIRE_DAYS * 86400),
+    activation_delay=(
+        settings.JWKS_CACHE_MAX_AGE
+        if settings.JWT_KEY_ACTIVATION_DELAY_SECONDS is None
+        else settings.JWT_KEY_ACTIVATION_DELAY_SECONDS
+    ),
+) if settings.ALGORITHM in ASYMMETRIC_ALGORITHMS else None
@@ -1,26 +1,100 @@
+import atexit
+import copy
+import json
 import os
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
+
+from app.core.settings import settings
+
+# Writes the records queued by the request path from a background thread
+_listener: Optional[QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats a record as a single-line JSON object.
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class LocalQueueHandler(QueueHandler):
+    """
+    Enqueues records for a listener of the same process.
+
+    The stock handler formats the traceback into the message and drops
+    exc_info, fit for a queue to another process. Here the records keep it,
+    so that the listener's formatter renders it, e.g. as the JSON "exception".
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
 
 
 def setup_logging():
+    global _listener
     log_dir = "logs"
     os.makedirs(log_dir, exist_ok=True)
     log_file = os.path.join(log_dir, "app.log")
 
     logger = logging.getLogger("auth_service")
-    logger.setLevel(logging.INFO)
+    logger.setLevel(settings.LOG_LEVEL)
+    if _listener is not None:
+        return logger
 
-    formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    )
+    if settings.LOG_FORMAT == "json":
+        formatter: logging.Formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(
+            "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+        )
 
     file_handler = RotatingFileHandler(log_file, maxBytes=10**6, backupCount=3)
     file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
 
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+
+    # Slow queries also go to their own file, see SQL_INSTRUMENTATION
+    slow_query_handler = RotatingFileHandler(
+        os.path.join(log_dir, "slow_queries.log"), maxBytes=10**6, backupCount=3
+    )
+    slow_query_handler.setFormatter(formatter)
+    slow_query_handler.addFilter(logging.Filter("auth_service.db.slow_query"))
+
+    # The loggers only enqueue the records, the file and console I/O (and the
+    # file rotation) happen in the listener thread instead of the request path
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    logger.addHandler(LocalQueueHandler(log_queue))
+    _listener = QueueListener(
+        log_queue, file_handler, console_handler, slow_query_handler, respect_handler_level=True
+    )
+    _listener.start()
+    atexit.register(stop_logging)
 
     return logger
+
+
+def stop_logging() -> None:
+    """
+    Writes out the queued records and stops the listener thread.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
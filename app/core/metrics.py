@@ -0,0 +1,163 @@
+import os
+import time
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest, multiprocess
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# With several workers, PROMETHEUS_MULTIPROC_DIR must point to an empty
+# directory shared by the workers (wiped before they start). Each worker then
+# writes its samples there and /metrics aggregates all of them.
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FAST_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries", "Database queries executed per HTTP request", ["route"],
+    buckets=QUERY_COUNT_BUCKETS,
+)
+REQUEST_DB_DURATION = Histogram(
+    "http_request_db_duration_seconds", "Database time per HTTP request", ["route"],
+    buckets=LATENCY_BUCKETS,
+)
+PASSWORD_HASH_DURATION = Histogram(
+    "password_hash_duration_seconds", "Password hashing and verification time in the worker pool", ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+PASSWORD_HASH_REJECTED = Counter(
+    "password_hash_rejected_total", "Password hashing jobs rejected because the pool queue was full",
+)
+JWT_DURATION = Histogram(
+    "jwt_duration_seconds", "JWT encoding and decoding time", ["operation"],
+    buckets=FAST_BUCKETS,
+)
+REPOSITORY_DURATION = Histogram(
+    "repository_call_duration_seconds", "Time of a repository database call", ["call"],
+    buckets=LATENCY_BUCKETS,
+)
+# The database metrics are labelled with the engine: "primary" or "replica-<n>"
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "Time of a database statement", ["engine"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections", "Connections checked out of the pool", ["engine"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_SIZE = Gauge(
+    "db_pool_size", "Configured pool size, summed over the workers", ["engine"], multiprocess_mode="livesum",
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Time waited for a pool connection", ["engine"], buckets=LATENCY_BUCKETS,
+)
+
+
+class QueryStats:
+    """
+    Database queries of the current request.
+    """
+    __slots__ = ("count", "seconds")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+# The stats object is mutated in place, so the queries run in the threadpool
+# (which works on a copy of the context) are counted as well
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("current_query_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = time.perf_counter()
+
+
+def instrument_engine(engine: Engine, pool_size: int, name: str = "primary") -> None:
+    """
+    Counts the queries of each request and tracks the statements and the
+    checked-out pool connections of the engine.
+    For an AsyncEngine, pass its sync_engine.
+
+    :param engine: The engine to instrument.
+    :param pool_size: The configured pool size.
+    :param name: The engine label of the metrics.
+    """
+    query_duration = DB_QUERY_DURATION.labels(name)
+    checked_out = DB_POOL_CHECKED_OUT.labels(name)
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._query_started
+        query_duration.observe(elapsed)
+        stats = current_query_stats.get()
+        if stats is not None:
+            stats.count += 1
+            stats.seconds += elapsed
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine, "checkout", lambda *args: checked_out.inc())
+    event.listen(engine, "checkin", lambda *args: checked_out.dec())
+    DB_POOL_SIZE.labels(name).inc(pool_size)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware observing the latency of each request by route template
+    and status, and the number and time of its database queries.
+    """
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats = QueryStats()
+        token = current_query_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            current_query_stats.reset(token)
+            # The route template, not the raw path, keeps the label cardinality bounded
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_DURATION.labels(scope["method"], route, str(status_code)).observe(elapsed)
+            REQUEST_DB_QUERIES.labels(route).observe(stats.count)
+            REQUEST_DB_DURATION.labels(route).observe(stats.seconds)
+
+
+def render_metrics() -> bytes:
+    """
+    Renders the metrics in the Prometheus text format, aggregated over all workers in multiprocess mode.
+    """
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def mark_process_dead() -> None:
+    """
+    Drops the live gauges of this worker on shutdown, in multiprocess mode.
+    """
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,122 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Tuple
+
+from app.core.settings import settings
+
+
+class RateLimitExceededError(Exception):
+    """
+    Raised when a rate limit is exceeded.
+    """
+    def __init__(self, retry_after: float):
+        super().__init__(f"Rate limit exceeded, retry after {retry_after:.1f} seconds")
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class TokenBucketLimiter:
+    """
+    Token bucket rate limiter keyed by an arbitrary value (username, client IP...).
+    Each key gets a bucket of `burst` tokens refilled at `rate` tokens per second.
+
+    Memory stays bounded: at most `maxsize` buckets are kept and the least
+    recently used one is dropped first. A dropped bucket comes back full, which
+    only lets a key that has been idle the longest start over.
+    """
+    def __init__(self, rate: float, burst: int, maxsize: int):
+        self.rate = rate
+        self.burst = burst
+        self.maxsize = maxsize
+        self._buckets: "OrderedDict[Hashable, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.limited = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0 and self.burst > 0 and self.maxsize > 0
+
+    def acquire(self, key: Hashable) -> float:
+        """
+        Takes a token from the bucket of a key.
+
+        :param key: The rate limited key.
+        :return: 0 if a token was taken, else the seconds until one is available.
+        """
+        if not self.enabled:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - updated) * self.rate)
+            if tokens >= 1:
+                tokens -= 1
+                retry_after = 0.0
+                self.allowed += 1
+            else:
+                retry_after = (1 - tokens) / self.rate
+                self.limited += 1
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+            return retry_after
+
+    def check(self, key: Hashable) -> None:
+        """
+        Takes a token from the bucket of a key.
+
+        :param key: The rate limited key.
+        :raises RateLimitExceededError: If the bucket is empty.
+        """
+        retry_after = self.acquire(key)
+        if retry_after > 0:
+            raise RateLimitExceededError(retry_after)
+
+    def refund(self, key: Hashable) -> None:
+        """
+        Gives back a token taken from the bucket of a key, e.g. for an attempt that
+        turned out not to count. The bucket never holds more than `burst` tokens.
+
+        :param key: The rate limited key.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            if key in self._buckets:
+                tokens, updated = self._buckets[key]
+                self._buckets[key] = (min(float(self.burst), tokens + 1), updated)
+                self.allowed -= 1
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "keys": len(self._buckets),
+            "maxsize": self.maxsize,
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+            "allowed": self.allowed,
+            "limited": self.limited,
+        }
+
+
+# Failed logins per user id, whichever of the username or the email is given:
+# each attempt takes a token before the password is verified, and a successful
+# one gives it back.
+login_username_limiter = TokenBucketLimiter(
+    rate=settings.LOGIN_USERNAME_PER_MINUTE / 60,
+    burst=settings.LOGIN_USERNAME_BURST,
+    maxsize=settings.LOGIN_LIMITER_MAX_KEYS,
+)
+login_ip_limiter = TokenBucketLimiter(
+    rate=settings.LOGIN_IP_PER_MINUTE / 60,
+    burst=settings.LOGIN_IP_BURST,
+    maxsize=settings.LOGIN_LIMITER_MAX_KEYS,
+)
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Dict
+
+from app.api.deps import session_scope
+from app.crud import TokenRepository
+
+logger = logging.getLogger("auth_service.core.revocation")
+
+
+class RevocationList:
+    """
+    In-memory set of the revoked access token ids.
+    Checking a token is a dict lookup, the database is only read by the
+    periodic sync. Revocations made by this process are visible at once,
+    the ones made by other processes after the next sync.
+    """
+    def __init__(self):
+        self._revoked: Dict[str, float] = {}
+        # Local revocations not seen in a sync yet, kept so that a sync that
+        # started before their commit doesn't drop them
+        self._unsynced: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.synced_at = 0.0
+
+    def is_revoked(self, jti: str) -> bool:
+        return jti in self._revoked
+
+    def add(self, jti: str, expires_at: float) -> None:
+        """
+        Marks a token as revoked in this process.
+
+        :param jti: The jti of the token.
+        :param expires_at: Expiration timestamp of the token.
+        """
+        with self._lock:
+            self._revoked[jti] = expires_at
+            self._unsynced[jti] = expires_at
+
+    def replace(self, revoked: Dict[str, float]) -> None:
+        """
+        Replaces the revoked tokens with the ones read from the database.
+        Expired tokens drop out here, as the database only returns active revocations.
+
+        :param revoked: Mapping of jti to the token expiration timestamp.
+        """
+        now = time.time()
+        with self._lock:
+            self._unsynced = {
+                jti: expires_at for jti, expires_at in self._unsynced.items()
+                if expires_at > now and jti not in revoked
+            }
+            self._revoked = {**revoked, **self._unsynced}
+            self.synced_at = now
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._revoked),
+            "unsynced": len(self._unsynced),
+            "synced_seconds_ago": time.time() - self.synced_at if self.synced_at else None,
+        }
+
+
+revocation_list = RevocationList()
+
+
+async def sync_revocations(purge: bool = False) -> None:
+    """
+    Reloads the revoked access tokens from the database.
+
+    :param purge: Also delete the expired tokens from the database.
+    """
+    async with session_scope() as db:
+        token_repo = TokenRepository(db)
+        if purge:
+            await token_repo.purge_expired_tokens()
+        revocation_list.replace(await token_repo.get_active_revocations())
+    logger.debug("Synced %s revoked access tokens.", len(revocation_list))
+
+
+async def sync_revocations_periodically(interval: float, purge_every: int = 60) -> None:
+    """
+    Syncs the revoked access tokens every interval seconds.
+    Expired tokens are purged from the database every purge_every syncs.
+    """
+    syncs = 0
+    while True:
+        await asyncio.sleep(interval)
+        syncs += 1
+        try:
+            await sync_revocations(purge=syncs % purge_every == 0)
+        except Exception as e:
+            logger.error("Failed to sync the revoked access tokens: %s", e)
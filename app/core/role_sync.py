@@ -0,0 +1,32 @@
+import asyncio
+import logging
+
+from app.api.deps import session_scope
+from app.crud import UserRepository
+from app.crud.role_index import role_index
+
+logger = logging.getLogger("auth_service.core.role_sync")
+
+
+async def sync_role_index() -> None:
+    """
+    Rebuilds the role index from the user_roles table.
+    """
+    role_index.begin_rebuild()
+    async with session_scope() as db:
+        role_index.replace(await UserRepository(db).get_role_assignments())
+    logger.debug("Synced %s user roles.", len(role_index))
+
+
+async def sync_role_index_periodically(interval: float) -> None:
+    """
+    Rebuilds the role index every interval seconds. The changes of the other
+    processes come from the change feed, this only repairs a drift, e.g. a
+    change made to user_roles outside of the service.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await sync_role_index()
+        except Exception as e:
+            logger.error("Failed to sync the role index: %s", e)
@@ -1,14 +1,21 @@
+import hashlib
 import logging
+import time
+import uuid
 from datetime import datetime, timedelta, timezone
 from jose import JWTError, jwt
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
 
-from app.api.deps import get_db
+from app.api.deps import DbSession, get_session
+from app.core.cache import TTLCache
+from app.core.keys import key_ring
+from app.core.metrics import JWT_DURATION
+from app.core.revocation import revocation_list
 from app.core.settings import settings
-from app.schemas import TokenData
+from app.crud import TokenRepository
+from app.schemas import TokenData, TokenIntrospection
 from app.services import UserService
 
 logger = logging.getLogger("auth_service.core.security")
@@ -18,11 +25,33 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/token")
 SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = settings.ALGORITHM
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
+REFRESH_TOKEN_EXPIRE_DAYS = settings.REFRESH_TOKEN_EXPIRE_DAYS
+TOKEN_CLAIMS_VERSION = settings.TOKEN_CLAIMS_VERSION
+
+# Decoded claims keyed by the token hash, each entry expires with its token
+token_cache = TTLCache(maxsize=settings.TOKEN_CACHE_MAX_SIZE, ttl=0)
+
+credentials_exception = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Failed to verify credentials",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
+
+def _encode_token(to_encode: Dict[str, Any]) -> str:
+    with JWT_DURATION.labels("encode").time():
+        if key_ring is not None:
+            signing_key = key_ring.signing_key()
+            return jwt.encode(
+                to_encode, signing_key.private_key, algorithm=ALGORITHM, headers={"kid": signing_key.kid}
+            )
+        return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     """
     Creates a JWT access token.
+    Every token gets a unique 'jti' claim so that it can be revoked.
 
     :param data: Dictionary containing the data to encode in the token.
     :param expires_delta: Optional timedelta for token expiration.
@@ -32,60 +61,304 @@ def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta]
     expire = datetime.now(timezone.utc) + (expires_delta if expires_delta
                                            else timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    logger.debug(f"Created JWT token for data: {data}")
+    to_encode.setdefault("jti", uuid.uuid4().hex)
+    encoded_jwt = _encode_token(to_encode)
+    logger.debug("Created JWT token for data: %s", data)
     return encoded_jwt
 
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> Optional[Any]:
+def create_refresh_token(username: str, jti: uuid.UUID, family_id: uuid.UUID, expires_at: datetime) -> str:
     """
-    Retrieves the current user based on the JWT token.
+    Creates a JWT refresh token. It is only accepted by the refresh endpoint.
+
+    :param username: The username of the token owner.
+    :param jti: The jti of the token, the key of its database record.
+    :param family_id: The family of the token.
+    :param expires_at: Expiration time of the token.
+    :return: Encoded JWT token as a string.
+    """
+    return _encode_token({
+        "sub": username,
+        "typ": "refresh",
+        "jti": str(jti),
+        "fam": str(family_id),
+        "exp": expires_at,
+    })
+
+
+def build_token_claims(user: Any) -> Dict[str, Any]:
+    """
+    Builds the token claims for a user.
+    In stateless mode the claims also carry the user id, the role per service
+    and the claims version, so that authorization needs no database lookup.
+
+    :param user: The User object the token is issued for.
+    :return: Dictionary of claims to encode in the token.
+    """
+    claims: Dict[str, Any] = {"sub": user.username}
+    if settings.STATELESS_AUTH:
+        claims.update({
+            "uid": str(user.id),
+            "roles": {str(role.service_id): role.role for role in user.roles},
+            "cv": TOKEN_CLAIMS_VERSION,
+        })
+    return claims
+
+
+def decode_access_token(token: str) -> Dict[str, Any]:
+    """
+    Verifies a JWT token and returns its claims.
+    Asymmetric tokens are verified with the key named by their 'kid' header.
 
     :param token: JWT token.
-    :param db: Database session.
-    :return: User object if token is valid and user exists.
-    :raises HTTPException: If token is invalid or user does not exist.
+    :return: The decoded claims.
+    :raises JWTError: If the token is invalid, expired or signed with an unknown key.
+    """
+    with JWT_DURATION.labels("decode").time():
+        if key_ring is None:
+            return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        verification_key = key_ring.verification_key(jwt.get_unverified_header(token).get("kid"))
+        if verification_key is None:
+            raise JWTError("The JWT token is signed with an unknown key")
+        return jwt.decode(token, verification_key.public_key, algorithms=[ALGORITHM])
+
+
+def decode_access_token_cached(token: str) -> Dict[str, Any]:
+    """
+    Verifies a JWT token and returns its claims, decoding each token only once.
+    The claims are cached under the token hash until the token expires.
+
+    :param token: JWT token.
+    :return: The decoded claims. They are shared between callers and must not be modified.
+    :raises JWTError: If the token is invalid, expired or signed with an unknown key.
+    """
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    payload = token_cache.get(key)
+    if payload is None:
+        payload = decode_access_token(token)
+        exp = payload.get("exp")
+        if isinstance(exp, (int, float)):
+            token_cache.set(key, payload, ttl=exp - time.time())
+    return payload
+
+
+def verify_access_token(token: str) -> Dict[str, Any]:
+    """
+    Verifies an access token, including its revocation.
+    The revocation check is an in-memory lookup, it never queries the database.
+
+    :param token: JWT token.
+    :return: The decoded claims.
+    :raises JWTError: If the token is invalid, expired, revoked or a refresh token.
+    """
+    payload = decode_access_token_cached(token)
+    if payload.get("typ") == "refresh":
+        raise JWTError("A refresh token can't be used as an access token")
+    jti = payload.get("jti")
+    if jti and revocation_list.is_revoked(jti):
+        raise JWTError("The token has been revoked")
+    return payload
+
+
+def get_token_data(token: str = Depends(oauth2_scheme)) -> TokenData:
+    """
+    Decodes the JWT token into its claims.
+
+    :param token: JWT token.
+    :return: TokenData with the decoded claims.
+    :raises HTTPException: If the token is invalid or does not contain a user.
     """
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Failed to verify credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: Optional[str] = payload.get("sub")
-        if username is None:
-            logger.error("The JWT token does not contain a user")
-            raise credentials_exception
-        token_data = TokenData(username=username)
+        payload = verify_access_token(token)
     except JWTError as e:
-        logger.error(f"Error decoding the JWT token: {e}")
+        logger.error("Error decoding the JWT token: %s", e)
+        raise credentials_exception
+    username: Optional[str] = payload.get("sub")
+    if username is None:
+        logger.error("The JWT token does not contain a user")
         raise credentials_exception
+    return TokenData(
+        username=username,
+        user_id=payload.get("uid"),
+        roles=payload.get("roles") or {},
+        claims_version=payload.get("cv"),
+        jti=payload.get("jti"),
+    )
 
+
+async def issue_tokens(user: Any, db: DbSession, family_id: Optional[uuid.UUID] = None) -> Dict[str, Any]:
+    """
+    Issues an access token and a refresh token for a user.
+
+    :param user: The User object or UserSnapshot the tokens are issued for.
+    :param db: Database session.
+    :param family_id: Optional family of the refresh token, a new one for a login.
+    :return: The token response with the access and refresh tokens.
+    """
+    jti = uuid.uuid4()
+    family_id = family_id or uuid.uuid4()
+    expires_at = datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    await TokenRepository(db).add_refresh_token(jti, family_id, user.id, expires_at)
+    return {
+        "access_token": create_access_token(data=build_token_claims(user)),
+        "refresh_token": create_refresh_token(user.username, jti, family_id, expires_at),
+        "token_type": "bearer",
+    }
+
+
+def _decode_refresh_token(token: str) -> Dict[str, Any]:
+    payload = decode_access_token(token)
+    if payload.get("typ") != "refresh" or not payload.get("jti") or not payload.get("fam"):
+        raise JWTError("Not a refresh token")
+    return payload
+
+
+async def refresh_tokens(refresh_token: str, db: DbSession) -> Optional[Dict[str, Any]]:
+    """
+    Exchanges a refresh token for a new access token and a new refresh token.
+    No password is verified. The presented refresh token can't be used again,
+    and presenting a used token revokes every token of its family.
+
+    :param refresh_token: The refresh token.
+    :param db: Database session.
+    :return: The new tokens, else None if the refresh token is invalid, used or revoked.
+    """
+    try:
+        payload = _decode_refresh_token(refresh_token)
+        jti = uuid.UUID(payload["jti"])
+        family_id = uuid.UUID(payload["fam"])
+    except (JWTError, ValueError) as e:
+        logger.warning("Invalid refresh token: %s", e)
+        return None
+
+    user = await UserService(db).get_user_snapshot_by_username(payload["sub"])
+    if user is None:
+        logger.warning("User %s of a refresh token not found", payload["sub"])
+        return None
+    new_jti = uuid.uuid4()
+    expires_at = datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    if not await TokenRepository(db).rotate_refresh_token(jti, new_jti, family_id, user.id, expires_at):
+        return None
+    return {
+        "access_token": create_access_token(data=build_token_claims(user)),
+        "refresh_token": create_refresh_token(user.username, new_jti, family_id, expires_at),
+        "token_type": "bearer",
+    }
+
+
+async def revoke_token(token: str, db: DbSession) -> bool:
+    """
+    Revokes an access token by its jti, or the whole family of a refresh token.
+
+    :param token: The access or refresh token to revoke.
+    :param db: Database session.
+    :return: True if the token was revoked, False if it is invalid or already expired.
+    """
+    try:
+        payload = decode_access_token(token)
+    except JWTError as e:
+        logger.warning("Revocation of an invalid token: %s", e)
+        return False
+    token_repo = TokenRepository(db)
+    if payload.get("typ") == "refresh":
+        try:
+            family_id = uuid.UUID(payload.get("fam") or "")
+        except ValueError:
+            return False
+        await token_repo.revoke_refresh_token_family(family_id)
+        return True
+    jti, exp = payload.get("jti"), payload.get("exp")
+    if not jti or not isinstance(exp, (int, float)):
+        logger.warning("The token has no jti or expiration and can't be revoked")
+        return False
+    await token_repo.revoke_access_token(jti, datetime.fromtimestamp(exp, timezone.utc))
+    revocation_list.add(jti, exp)
+    return True
+
+
+async def get_current_user(
+    token_data: TokenData = Depends(get_token_data),
+    db: DbSession = Depends(get_session)
+) -> Optional[Any]:
+    """
+    Retrieves the current user based on the JWT token.
+
+    :param token_data: The decoded JWT token claims.
+    :param db: Database session.
+    :return: Cached UserSnapshot if token is valid and user exists.
+    :raises HTTPException: If token is invalid or user does not exist.
+    """
     user_service = UserService(db)
-    user = user_service.get_user_by_username(token_data.username)
+    user = await user_service.get_user_snapshot_by_username(token_data.username)
     if user is None:
-        logger.error(f"User {token_data.username} not found")
+        logger.error("User %s not found", token_data.username)
         raise credentials_exception
     return user
 
 
-def get_current_admin_user(
-    current_user: Any = Depends(get_current_user)
+async def introspect_tokens(tokens: List[str], db: DbSession) -> List[TokenIntrospection]:
+    """
+    Reports the state of many tokens at once.
+    The tokens are decoded through the decoded-token cache and their users
+    are looked up together, from the user cache or with a single query.
+    A token is active if it is a valid access token, not revoked, and its user still exists.
+
+    :param tokens: The JWT tokens to introspect.
+    :param db: Database session.
+    :return: One TokenIntrospection per token, in the same order.
+    """
+    payloads: List[Optional[Dict[str, Any]]] = []
+    for token in tokens:
+        try:
+            payload = verify_access_token(token)
+        except JWTError as e:
+            logger.debug("Introspected an invalid token: %s", e)
+            payload = None
+        payloads.append(payload if payload is not None and payload.get("sub") else None)
+
+    usernames = [payload["sub"] for payload in payloads if payload is not None]
+    users = await UserService(db).get_user_snapshots_by_usernames(usernames) if usernames else {}
+
+    results = []
+    for payload in payloads:
+        user = users.get(payload["sub"]) if payload is not None else None
+        if user is None:
+            results.append(TokenIntrospection(active=False))
+            continue
+        results.append(TokenIntrospection(
+            active=True,
+            sub=user.username,
+            user_id=str(user.id),
+            roles={str(role.service_id): role.role for role in user.roles},
+            exp=payload.get("exp"),
+        ))
+    return results
+
+
+async def get_current_admin_user(
+    token_data: TokenData = Depends(get_token_data),
+    db: DbSession = Depends(get_session)
 ) -> Any:
     """
     Ensures that the current user has administrative privileges.
+    In stateless mode the decision is taken from the token claims alone,
+    the database is only used when the claims version is stale.
 
-    :param current_user: The current authenticated user.
-    :return: The current user if they have admin rights.
+    :param token_data: The decoded JWT token claims.
+    :param db: Database session.
+    :return: The current user, or its claims in stateless mode, if they have admin rights.
     :raises HTTPException: If the user lacks admin rights.
     """
+    if settings.STATELESS_AUTH and token_data.claims_version == TOKEN_CLAIMS_VERSION:
+        if "admin" not in token_data.roles.values():
+            logger.warning("The user %s does not have administrative rights", token_data.username)
+            raise HTTPException(status_code=403, detail="Not enough rights")
+        return token_data
+
+    current_user = await get_current_user(token_data, db)
     # Check if the user has an 'admin' role in any service
     admin_role = any(role.role == "admin" for role in current_user.roles)
     if not admin_role:
-        logger.warning(f"The user {current_user.username} does not have administrative rights")
+        logger.warning("The user %s does not have administrative rights", current_user.username)
         raise HTTPException(status_code=403, detail="Not enough rights")
     return current_user
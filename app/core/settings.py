@@ -1,4 +1,5 @@
 import os
+from typing import List, Optional
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -14,11 +15,123 @@ class Settings(BaseSettings):
     DATABASE_URL: str = (
         f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
     )
+    # Serve requests through AsyncEngine + asyncpg instead of the sync psycopg2 engine.
+    # ASYNC_DATABASE_URL defaults to DATABASE_URL with the async driver.
+    DB_ASYNC: bool = False
+    ASYNC_DATABASE_URL: Optional[str] = None
+
+    # Connection pool, sized per replica
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = -1
+    DB_POOL_PRE_PING: bool = False
+
+    # Read replicas (same URL format as DATABASE_URL). The read-only repository
+    # methods are spread over the healthy ones, a replica lagging more than
+    # DB_REPLICA_MAX_LAG_SECONDS behind the primary is left out until it catches up.
+    DB_REPLICA_URLS: List[str] = []
+    DB_REPLICA_HEALTH_CHECK_SECONDS: float = 5.0
+    DB_REPLICA_MAX_LAG_SECONDS: float = 5.0
+
+    # Startup. The schema is managed by alembic, DB_CREATE_ALL creates the missing
+    # tables on startup instead (local runs, tests). DB_WARMUP_CONNECTIONS pool
+    # connections are opened before the app reports ready, defaults to DB_POOL_SIZE.
+    DB_CREATE_ALL: bool = False
+    DB_WARMUP_CONNECTIONS: Optional[int] = None
 
     # JWT Settings
     SECRET_KEY: str = os.getenv("SECRET_KEY")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
+    # Stateless mode puts the user id and roles into the token claims.
+    # Bump TOKEN_CLAIMS_VERSION to make already issued claims stale.
+    STATELESS_AUTH: bool = False
+    TOKEN_CLAIMS_VERSION: int = 1
+    # With RS256/ES256 the signing keys are read from JWT_KEYS_DIR/<kid>.pem instead of SECRET_KEY.
+    # The public keys are served as a JWKS. Unless JWT_ACTIVE_KID is set, the newest key signs
+    # once its file is JWT_KEY_ACTIVATION_DELAY_SECONDS old (defaults to JWKS_CACHE_MAX_AGE),
+    # so that the consumers caching the JWKS know it before the first token it signs.
+    JWT_KEYS_DIR: str = "keys"
+    JWT_ACTIVE_KID: Optional[str] = None
+    JWT_KEYS_RELOAD_SECONDS: float = 60.0
+    JWT_KEY_ACTIVATION_DELAY_SECONDS: Optional[float] = None
+    JWKS_CACHE_MAX_AGE: int = 300
+    # Refresh tokens are rotated on every use. Revoked access tokens are
+    # synced from the database into memory every REVOCATION_SYNC_SECONDS.
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 14
+    REVOCATION_SYNC_SECONDS: float = 10.0
+
+    # Password hashing policy. The first scheme hashes new passwords, the others
+    # are only verified. Hashes of another scheme or weaker parameters are
+    # replaced on the next successful login when PASSWORD_REHASH_ON_LOGIN is on.
+    # argon2 needs the argon2 extra (argon2-cffi).
+    PASSWORD_HASH_SCHEMES: List[str] = ["bcrypt"]
+    BCRYPT_ROUNDS: int = 12
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 65536  # KiB
+    ARGON2_PARALLELISM: int = 4
+    PASSWORD_REHASH_ON_LOGIN: bool = True
+
+    # Password hashing pool
+    PASSWORD_HASH_EXECUTOR: str = "thread"  # "thread" or "process"
+    PASSWORD_HASH_WORKERS: int = os.cpu_count() or 1
+    PASSWORD_HASH_MAX_PENDING: int = 64
+
+    # Login throttling, token buckets of failed logins per user and of logins per client IP.
+    # PASSWORD_HASH_MAX_PENDING caps the password verifications in flight across all keys.
+    LOGIN_USERNAME_PER_MINUTE: float = 5.0
+    LOGIN_USERNAME_BURST: int = 5
+    LOGIN_IP_PER_MINUTE: float = 60.0
+    LOGIN_IP_BURST: int = 20
+    LOGIN_LIMITER_MAX_KEYS: int = 100000
+
+    # Bulk provisioning, rows inserted and committed per chunk
+    BULK_CHUNK_SIZE: int = 500
+    # User export, rows fetched from the server-side cursor at a time
+    EXPORT_BATCH_SIZE: int = 1000
+    # How far back the next updated_since of an export starts before the export itself.
+    # updated_at is the start of the writing transaction and the export may read a
+    # replica: this must exceed the longest write transaction plus DB_REPLICA_MAX_LAG_SECONDS.
+    EXPORT_WATERMARK_OVERLAP_SECONDS: float = 300.0
+
+    # Substring user search: the matches are sorted for the page, a term matching more
+    # users than this is refused rather than sorting them all
+    USER_SEARCH_MAX_CANDIDATES: int = 1000
+
+    # User lookup cache, a max size of 0 disables it
+    USER_CACHE_MAX_SIZE: int = 10000
+    USER_CACHE_TTL_SECONDS: float = 30.0
+
+    # Logging, LOG_FORMAT is "text" or "json"
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "text"
+
+    # Prometheus metrics, served on /metrics
+    METRICS_ENABLED: bool = True
+
+    # Opt-in SQL tracing: statement count and time per request in the response
+    # headers, N+1 warnings, and statements slower than SQL_SLOW_QUERY_MS logged
+    # with the names and types of their parameters (never the values) to logs/slow_queries.log
+    SQL_INSTRUMENTATION: bool = False
+    SQL_SLOW_QUERY_MS: float = 100.0
+    SQL_N_PLUS_ONE_THRESHOLD: int = 5
+
+    # Decoded token cache, entries expire with their token, a max size of 0 disables it
+    TOKEN_CACHE_MAX_SIZE: int = 10000
+    # Maximum number of tokens in one introspection request
+    INTROSPECTION_MAX_TOKENS: int = 100
+
+    # Authorization checks are answered from an in-memory role index, kept up to date
+    # from the change feed and only rebuilt from user_roles every ROLE_INDEX_REBUILD_SECONDS
+    ROLE_INDEX_REBUILD_SECONDS: float = 3600.0
+    AUTHORIZATION_MAX_CHECKS: int = 100
+
+    # Change feed. Every user and role mutation is recorded in change_events. Each
+    # worker follows the feed to invalidate its caches every CHANGE_FEED_POLL_SECONDS,
+    # and within milliseconds on a Postgres NOTIFY when CHANGE_FEED_LISTEN is on.
+    CHANGE_FEED_POLL_SECONDS: float = 5.0
+    CHANGE_FEED_LISTEN: bool = False
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
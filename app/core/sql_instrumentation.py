@@ -0,0 +1,138 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.settings import settings
+
+logger = logging.getLogger("auth_service.db.sql")
+slow_query_logger = logging.getLogger("auth_service.db.slow_query")
+
+# Placeholder lists of expanded IN clauses, e.g. (?, ?, ?) or ($1, $2), collapse into one
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\?|%\(\w+\)s|\$\d+|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|\$\d+|:\w+))*\s*\)")
+_NUMBERED_PLACEHOLDER = re.compile(r"\$\d+|%\(\w+\)s|:\w+")
+_WHITESPACE = re.compile(r"\s+")
+MAX_LOGGED_PARAMETERS = 500
+
+
+def describe_parameters(parameters: Any) -> str:
+    """
+    Describes the parameters of a statement by their names and types only: the
+    values are credentials, password hashes, tokens or personal data often enough
+    that the slow query log never shows them.
+    """
+    if isinstance(parameters, (list, tuple)) and parameters and isinstance(parameters[0], (dict, list, tuple)):
+        return f"{len(parameters)} rows of {describe_parameters(parameters[0])}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{name}: {type(value).__name__}" for name, value in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(type(value).__name__ for value in parameters) + ")"
+    return type(parameters).__name__
+
+
+def fingerprint(statement: str) -> str:
+    """
+    Normalizes a statement so that the executions of the same query with other parameters compare equal.
+    """
+    statement = _NUMBERED_PLACEHOLDER.sub("?", statement)
+    statement = _PLACEHOLDER_LIST.sub("(?)", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+class SqlTrace:
+    """
+    Statements executed while serving one request.
+    """
+    __slots__ = ("scope", "count", "seconds", "fingerprints")
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.count = 0
+        self.seconds = 0.0
+        self.fingerprints: Counter = Counter()
+
+    @property
+    def route(self) -> str:
+        return getattr(self.scope.get("route"), "path", self.scope.get("path", "-"))
+
+
+current_sql_trace: ContextVar[Optional[SqlTrace]] = ContextVar("current_sql_trace", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._sql_started = time.perf_counter()
+
+
+def instrument_sql(engine: Engine, name: str = "primary") -> None:
+    """
+    Traces the statements of each request and logs the slow ones.
+    For an AsyncEngine, pass its sync_engine.
+
+    :param engine: The engine to instrument.
+    :param name: The engine named in the slow query log, "primary" or "replica-<n>".
+    """
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._sql_started
+        trace = current_sql_trace.get()
+        if trace is not None:
+            trace.count += 1
+            trace.seconds += elapsed
+            trace.fingerprints[fingerprint(statement)] += 1
+        if elapsed * 1000 >= settings.SQL_SLOW_QUERY_MS:
+            parameters_description = describe_parameters(parameters)
+            if len(parameters_description) > MAX_LOGGED_PARAMETERS:
+                parameters_description = parameters_description[:MAX_LOGGED_PARAMETERS] + "..."
+            slow_query_logger.warning(
+                "Slow query (%.1f ms) on %s [%s]: %s | parameters: %s",
+                elapsed * 1000, trace.route if trace else "-", name, _WHITESPACE.sub(" ", statement).strip(),
+                parameters_description,
+            )
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    logger.info("SQL instrumentation enabled on %s, slow query threshold %s ms.", name, settings.SQL_SLOW_QUERY_MS)
+
+
+class SqlInstrumentationMiddleware:
+    """
+    Pure ASGI middleware reporting the statements of each request: their count
+    and total time in the X-DB-Queries and X-DB-Time-Ms response headers, and a
+    warning for every statement repeated often enough to look like an N+1 pattern.
+    """
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = SqlTrace(scope)
+        token = current_sql_trace.set(trace)
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-queries", str(trace.count).encode()))
+                headers.append((b"x-db-time-ms", f"{trace.seconds * 1000:.2f}".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            current_sql_trace.reset(token)
+            logger.debug(
+                "%s %s: %s statements in %.1f ms", scope["method"], trace.route, trace.count, trace.seconds * 1000
+            )
+            for statement, repeats in trace.fingerprints.items():
+                if repeats >= settings.SQL_N_PLUS_ONE_THRESHOLD:
+                    logger.warning(
+                        "Possible N+1 on %s %s: statement executed %s times: %s",
+                        scope["method"], trace.route, repeats, statement[:300]
+                    )
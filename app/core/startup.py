@@ -0,0 +1,53 @@
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+
+class StartupState:
+    """
+    Tracks how long the application took to import and to warm up, and
+    whether it is ready to take traffic. Created on the first import of
+    app.main, so that the import time covers the rest of the application.
+    """
+    def __init__(self):
+        self.ready = False
+        self._created = time.perf_counter()
+        self.import_ms: Optional[float] = None
+        self.startup_ms: Optional[float] = None
+        self.steps: Dict[str, float] = {}
+
+    def mark_imported(self) -> None:
+        self.import_ms = (time.perf_counter() - self._created) * 1000
+
+    @contextmanager
+    def step(self, name: str) -> Iterator[None]:
+        """
+        Times one warm-up step.
+
+        :param name: Name of the step, reported in the stats.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps[name] = (time.perf_counter() - started) * 1000
+
+    def mark_ready(self, started: float) -> None:
+        """
+        Marks the application as ready to take traffic.
+
+        :param started: The perf_counter value when the startup began.
+        """
+        self.startup_ms = (time.perf_counter() - started) * 1000
+        self.ready = True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "import_ms": self.import_ms,
+            "startup_ms": self.startup_ms,
+            "steps_ms": dict(self.steps),
+        }
+
+
+startup_state = StartupState()
@@ -1,19 +1,10 @@
-from app.crud.user_crud import (
-    get_user_by_username,
-    get_user_by_email,
-    get_users,
-    create_user,
-    delete_user,
-    add_user_role,
-    authenticate_user
-)
+from app.crud.change_crud import ChangeRepository
+from app.crud.token_crud import TokenRepository
+from app.crud.user_crud import SearchTooBroadError, UserRepository
 
 __all__ = [
-    "get_user_by_username",
-    "get_user_by_email",
-    "get_users",
-    "create_user",
-    "delete_user",
-    "add_user_role",
-    "authenticate_user",
+    "ChangeRepository",
+    "SearchTooBroadError",
+    "TokenRepository",
+    "UserRepository",
 ]
@@ -0,0 +1,77 @@
+import functools
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional, TypeVar, Union
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.metrics import REPOSITORY_DURATION
+
+T = TypeVar("T")
+
+LIKE_ESCAPE = "/"
+
+
+def dialect_insert(db: Session, model: Any) -> Any:
+    """
+    Returns an INSERT construct supporting ON CONFLICT for the session's database.
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite.insert(model)
+    return postgresql.insert(model)
+
+
+def escape_like(value: str) -> str:
+    """
+    Escapes the LIKE wildcards of a value, with LIKE_ESCAPE as the escape character.
+    A slash rather than a backslash, whose quoting depends on standard_conforming_strings.
+    """
+    for char in (LIKE_ESCAPE, "%", "_"):
+        value = value.replace(char, LIKE_ESCAPE + char)
+    return value
+
+
+class BaseRepository:
+    """
+    Base class of the repositories.
+
+    The public methods of a repository are coroutines. The queries themselves
+    are written against a sync Session and are run through the async session's
+    greenlet bridge (AsyncSession.run_sync) when the repository is given an
+    AsyncSession, or in the threadpool when it is given a sync Session.
+
+    Read-only methods that can do with slightly stale data pass replica=True
+    and are sent to a read replica when there is one (see RoutingSession).
+    """
+    def __init__(self, db: Union[Session, AsyncSession]):
+        if isinstance(db, AsyncSession):
+            self.async_db: Optional[AsyncSession] = db
+            self.db = db.sync_session
+        else:
+            self.async_db = None
+            self.db = db
+
+    @contextmanager
+    def _on_replica(self) -> Iterator[None]:
+        self.db.info["replica"] = True
+        try:
+            yield
+        finally:
+            self.db.info["replica"] = False
+
+    def _call_on_replica(self, func: Callable[..., T], *args: Any) -> T:
+        with self._on_replica():
+            return func(*args)
+
+    async def _run(self, func: Callable[..., T], *args: Any, replica: bool = False) -> T:
+        started = time.perf_counter()
+        call = functools.partial(self._call_on_replica, func) if replica else func
+        try:
+            if self.async_db is not None:
+                return await self.async_db.run_sync(lambda _: call(*args))
+            return await run_in_threadpool(call, *args)
+        finally:
+            REPOSITORY_DURATION.labels(func.__name__.lstrip("_")).observe(time.perf_counter() - started)
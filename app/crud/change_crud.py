@@ -0,0 +1,88 @@
+import logging
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app import models
+from app.crud.base import BaseRepository
+
+logger = logging.getLogger("auth_service.crud.change")
+
+# NOTIFY channel woken up by every transaction that records changes
+CHANGES_CHANNEL = "auth_service_changes"
+# Serializes the transactions that record changes (pg_advisory_xact_lock key)
+CHANGES_LOCK_KEY = 0x61757468
+
+
+def record_changes(db: Session, changes: List[Dict[str, Any]]) -> None:
+    """
+    Adds change events to the current transaction, committed along with the mutation.
+
+    On Postgres a transaction-level advisory lock is taken first and held until
+    the commit. The versions come from a sequence, without the lock a transaction
+    could commit a lower version after a consumer has already read a higher one
+    and the consumer would never see it. Listeners are notified on commit.
+
+    :param db: The session of the mutation.
+    :param changes: Dicts with entity, operation, user_id, username, email and,
+        for a user role, service_id and role.
+    """
+    if not changes:
+        return
+    postgres = db.get_bind().dialect.name == "postgresql"
+    if postgres:
+        db.execute(select(func.pg_advisory_xact_lock(CHANGES_LOCK_KEY)))
+    db.execute(models.ChangeEvent.__table__.insert(), changes)
+    if postgres:
+        db.execute(select(func.pg_notify(CHANGES_CHANNEL, "")))
+
+
+def user_change(operation: str, user_id: Any, username: str, email: str) -> Dict[str, Any]:
+    return {"entity": "user", "operation": operation, "user_id": user_id, "username": username, "email": email}
+
+
+def user_role_change(
+    operation: str, user_id: Any, username: str, email: str, service_id: Any, role: Optional[str] = None
+) -> Dict[str, Any]:
+    return {
+        "entity": "user_role",
+        "operation": operation,
+        "user_id": user_id,
+        "username": username,
+        "email": email,
+        "service_id": service_id,
+        "role": role,
+    }
+
+
+class ChangeRepository(BaseRepository):
+    """
+    Repository class for the change feed.
+    """
+    async def get_changes(self, since: int, limit: int) -> List[models.ChangeEvent]:
+        """
+        Retrieves the changes recorded after a version, oldest first.
+
+        :param since: The last version already seen, 0 for the start of the feed.
+        :param limit: Maximum number of changes to return.
+        :return: List of ChangeEvent objects.
+        """
+        return await self._run(self._get_changes, since, limit)
+
+    def _get_changes(self, since: int, limit: int) -> List[models.ChangeEvent]:
+        return list(self.db.execute(
+            select(models.ChangeEvent)
+            .where(models.ChangeEvent.version > since)
+            .order_by(models.ChangeEvent.version)
+            .limit(limit)
+        ).scalars())
+
+    async def get_latest_version(self) -> int:
+        """
+        Returns the version of the latest change, 0 if the feed is empty.
+        """
+        return await self._run(self._get_latest_version)
+
+    def _get_latest_version(self) -> int:
+        return self.db.execute(select(func.max(models.ChangeEvent.version))).scalar() or 0
@@ -0,0 +1,27 @@
+import base64
+import binascii
+
+
+def encode_cursor(value: str) -> str:
+    """
+    Encodes the last seen sort key into an opaque pagination cursor.
+
+    :param value: The sort key of the last returned row.
+    :return: URL-safe cursor string.
+    """
+    return base64.urlsafe_b64encode(value.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> str:
+    """
+    Decodes a pagination cursor back into the last seen sort key.
+
+    :param cursor: Cursor returned by a previous page.
+    :return: The sort key to continue after.
+    :raises ValueError: If the cursor is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return base64.b64decode(padded.encode("ascii"), altchars=b"-_", validate=True).decode("utf-8")
+    except (binascii.Error, UnicodeError) as e:
+        raise ValueError("Invalid pagination cursor") from e
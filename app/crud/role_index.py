@@ -0,0 +1,98 @@
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+
+class RoleIndex:
+    """
+    In-memory index of the role of every user in every service, keyed by
+    user id then service id, as strings like in the token claims.
+
+    An authorization check is two dict lookups. The index is loaded once and
+    then kept up to date change by change: the repository applies the role
+    changes of this process as it commits them, the change feed follower the
+    ones of the other processes. A full rebuild is only a rare fallback.
+    """
+    def __init__(self):
+        self._roles: Dict[str, Dict[str, str]] = {}
+        # Changes (None for a removal) applied while a rebuild reads the table,
+        # kept so that a rebuild that started before their commit doesn't undo them
+        self._unsynced: Optional[Dict[Tuple[str, str], Optional[str]]] = None
+        self._lock = threading.Lock()
+        self.loaded = False
+        self.synced_at = 0.0
+
+    def get_role(self, user_id: Any, service_id: Any) -> Optional[str]:
+        """
+        Returns the role of a user in a service, None if they have none.
+        """
+        return self._roles.get(str(user_id), {}).get(str(service_id))
+
+    def _apply(self, user_id: str, service_id: str, role: Optional[str]) -> None:
+        if role is not None:
+            self._roles.setdefault(user_id, {})[service_id] = role
+            return
+        services = self._roles.get(user_id)
+        if services is not None:
+            services.pop(service_id, None)
+            if not services:
+                del self._roles[user_id]
+
+    def set_roles(self, assignments: Iterable[Tuple[Any, Any, Optional[str]]]) -> None:
+        """
+        Records committed role changes.
+
+        :param assignments: (user_id, service_id, role) triples, a role of None removes it.
+        """
+        with self._lock:
+            for user_id, service_id, role in assignments:
+                key = (str(user_id), str(service_id))
+                self._apply(*key, role)
+                if self._unsynced is not None:
+                    self._unsynced[key] = role
+
+    def remove_user(self, user_id: Any) -> None:
+        """
+        Records the deletion of a user, with all their roles.
+        """
+        user_id = str(user_id)
+        self.set_roles((user_id, service_id, None) for service_id in list(self._roles.get(user_id, {})))
+
+    def begin_rebuild(self) -> None:
+        """
+        Starts recording the changes applied from now on, to be called before reading the table.
+        """
+        with self._lock:
+            self._unsynced = {}
+
+    def replace(self, assignments: Iterable[Tuple[Any, Any, str]]) -> None:
+        """
+        Replaces the index with the roles read from the database.
+        The changes applied since begin_rebuild() are applied again on top.
+
+        :param assignments: All the (user_id, service_id, role) triples.
+        """
+        roles: Dict[str, Dict[str, str]] = {}
+        for user_id, service_id, role in assignments:
+            roles.setdefault(str(user_id), {})[str(service_id)] = role
+        with self._lock:
+            self._roles = roles
+            for (user_id, service_id), role in (self._unsynced or {}).items():
+                self._apply(user_id, service_id, role)
+            self._unsynced = None
+            self.loaded = True
+            self.synced_at = time.time()
+
+    def __len__(self) -> int:
+        return sum(len(services) for services in self._roles.values())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "users": len(self._roles),
+            "roles": len(self),
+            "rebuilding": self._unsynced is not None,
+            "synced_seconds_ago": time.time() - self.synced_at if self.synced_at else None,
+        }
+
+
+role_index = RoleIndex()
@@ -0,0 +1,156 @@
+import logging
+import uuid
+from datetime import datetime, timezone
+from sqlalchemy import delete, select, update
+from typing import Dict
+
+from app import models
+from app.crud.base import BaseRepository, dialect_insert
+
+logger = logging.getLogger("auth_service.crud.token")
+
+
+class TokenRepository(BaseRepository):
+    """
+    Repository class for refresh tokens and revoked access tokens.
+    """
+    async def add_refresh_token(
+        self, jti: uuid.UUID, family_id: uuid.UUID, user_id: uuid.UUID, expires_at: datetime
+    ) -> None:
+        """
+        Stores a newly issued refresh token.
+
+        :param jti: The jti of the refresh token.
+        :param family_id: The family of the token, new for every login.
+        :param user_id: The id of the token owner.
+        :param expires_at: Expiration time of the token.
+        """
+        await self._run(self._add_refresh_token, jti, family_id, user_id, expires_at)
+
+    def _add_refresh_token(
+        self, jti: uuid.UUID, family_id: uuid.UUID, user_id: uuid.UUID, expires_at: datetime
+    ) -> None:
+        self.db.add(models.RefreshToken(id=jti, family_id=family_id, user_id=user_id, expires_at=expires_at))
+        self.db.commit()
+
+    async def rotate_refresh_token(
+        self, jti: uuid.UUID, new_jti: uuid.UUID, family_id: uuid.UUID, user_id: uuid.UUID, expires_at: datetime
+    ) -> bool:
+        """
+        Marks a refresh token as used and stores its successor, in one transaction.
+        The token is only used once: a conditional UPDATE claims it, so two
+        concurrent refreshes with the same token can't both succeed. A token
+        that was already used or revoked revokes its whole family.
+
+        :param jti: The jti of the presented refresh token.
+        :param new_jti: The jti of the refresh token replacing it.
+        :param family_id: The family of the token.
+        :param user_id: The id of the token owner.
+        :param expires_at: Expiration time of the new token.
+        :return: True if the token was exchanged, False if it was unknown, expired, used or revoked.
+        """
+        return await self._run(self._rotate_refresh_token, jti, new_jti, family_id, user_id, expires_at)
+
+    def _rotate_refresh_token(
+        self, jti: uuid.UUID, new_jti: uuid.UUID, family_id: uuid.UUID, user_id: uuid.UUID, expires_at: datetime
+    ) -> bool:
+        now = datetime.now(timezone.utc)
+        result = self.db.execute(
+            update(models.RefreshToken)
+            .where(
+                models.RefreshToken.id == jti,
+                models.RefreshToken.family_id == family_id,
+                models.RefreshToken.used_at.is_(None),
+                models.RefreshToken.revoked_at.is_(None),
+                models.RefreshToken.expires_at > now,
+            )
+            .values(used_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            self.db.rollback()
+            revoked = self._revoke_refresh_token_family(family_id)
+            logger.warning(
+                "Refresh token %s was reused or is no longer valid, %s tokens of its family revoked.", jti, revoked
+            )
+            return False
+        self.db.add(models.RefreshToken(id=new_jti, family_id=family_id, user_id=user_id, expires_at=expires_at))
+        self.db.commit()
+        return True
+
+    async def revoke_refresh_token_family(self, family_id: uuid.UUID) -> int:
+        """
+        Revokes every refresh token rotated from the same login.
+
+        :param family_id: The family of the tokens.
+        :return: Number of revoked tokens.
+        """
+        return await self._run(self._revoke_refresh_token_family, family_id)
+
+    def _revoke_refresh_token_family(self, family_id: uuid.UUID) -> int:
+        result = self.db.execute(
+            update(models.RefreshToken)
+            .where(models.RefreshToken.family_id == family_id, models.RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=datetime.now(timezone.utc))
+            .execution_options(synchronize_session=False)
+        )
+        self.db.commit()
+        return result.rowcount
+
+    async def revoke_access_token(self, jti: str, expires_at: datetime) -> None:
+        """
+        Adds an access token to the revoked tokens.
+
+        :param jti: The jti of the access token.
+        :param expires_at: Expiration time of the token, after which the entry is purged.
+        """
+        await self._run(self._revoke_access_token, jti, expires_at)
+
+    def _revoke_access_token(self, jti: str, expires_at: datetime) -> None:
+        self.db.execute(
+            dialect_insert(self.db, models.RevokedToken)
+            .values(jti=jti, expires_at=expires_at)
+            .on_conflict_do_nothing()
+        )
+        self.db.commit()
+        logger.info("Access token %s revoked.", jti)
+
+    async def get_active_revocations(self) -> Dict[str, float]:
+        """
+        Loads the revoked access tokens that have not expired yet.
+
+        :return: Mapping of jti to the token expiration timestamp.
+        """
+        return await self._run(self._get_active_revocations)
+
+    def _get_active_revocations(self) -> Dict[str, float]:
+        rows = self.db.execute(
+            select(models.RevokedToken.jti, models.RevokedToken.expires_at)
+            .where(models.RevokedToken.expires_at > datetime.now(timezone.utc))
+        ).all()
+        # Connection goes back to the pool, the caller keeps no ORM state
+        self.db.rollback()
+        return {
+            row.jti: (row.expires_at if row.expires_at.tzinfo else row.expires_at.replace(tzinfo=timezone.utc)).timestamp()
+            for row in rows
+        }
+
+    async def purge_expired_tokens(self) -> int:
+        """
+        Deletes the refresh tokens and revoked access tokens that have expired.
+
+        :return: Number of deleted rows.
+        """
+        return await self._run(self._purge_expired_tokens)
+
+    def _purge_expired_tokens(self) -> int:
+        now = datetime.now(timezone.utc)
+        deleted = 0
+        for model in (models.RefreshToken, models.RevokedToken):
+            deleted += self.db.execute(
+                delete(model).where(model.expires_at <= now).execution_options(synchronize_session=False)
+            ).rowcount
+        self.db.commit()
+        if deleted:
+            logger.info("Purged %s expired tokens.", deleted)
+        return deleted
@@ -0,0 +1,57 @@
+import uuid
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from app import models
+from app.core.cache import TTLCache
+from app.core.settings import settings
+
+
+@dataclass(frozen=True)
+class UserRoleSnapshot:
+    """
+    Immutable copy of a user role, detached from the database session.
+    """
+    id: uuid.UUID
+    role: str
+    service_id: uuid.UUID
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """
+    Immutable copy of a user and their roles, detached from the database session.
+    The password hash is deliberately not kept in memory.
+    """
+    id: uuid.UUID
+    username: str
+    email: str
+    roles: Tuple[UserRoleSnapshot, ...]
+
+    @classmethod
+    def from_user(cls, user: models.User) -> "UserSnapshot":
+        return cls(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            roles=tuple(
+                UserRoleSnapshot(id=role.id, role=role.role, service_id=role.service_id)
+                for role in user.roles
+            ),
+        )
+
+
+user_cache = TTLCache(maxsize=settings.USER_CACHE_MAX_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS)
+
+
+def get_cached_user(field: str, value: str) -> Optional[UserSnapshot]:
+    return user_cache.get((field, value))
+
+
+def cache_user(snapshot: UserSnapshot) -> None:
+    user_cache.set(("username", snapshot.username), snapshot)
+    user_cache.set(("email", snapshot.email), snapshot)
+
+
+def invalidate_user(username: str, email: str) -> None:
+    user_cache.delete(("username", username), ("email", email))
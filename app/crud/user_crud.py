@@ -1,93 +1,356 @@
 import logging
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from passlib.context import CryptContext
+import uuid
+from datetime import datetime
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, func, or_, select, tuple_, update
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Query, selectinload
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
 
 from app import models, schemas
+from app.api.deps import session_scope
+from app.core.background import run_in_background
+from app.core.hashing import HashingQueueFullError, password_hasher
+from app.core.rate_limit import login_username_limiter
+from app.core.settings import settings
+from app.crud.base import LIKE_ESCAPE, BaseRepository, dialect_insert, escape_like
+from app.crud.change_crud import record_changes, user_change, user_role_change
+from app.crud.role_index import role_index
+from app.crud.user_cache import UserSnapshot, cache_user, get_cached_user, invalidate_user
 
 logger = logging.getLogger("auth_service.crud.user")
 
-# Initialize the password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Loads the roles and their services along with the user, so that a returned
+# user can be serialized without lazy loads (which the async session forbids).
+USER_LOAD_OPTIONS = (
+    selectinload(models.User.roles).selectinload(models.UserRole.service),
+)
 
 
-class UserRepository:
+class SearchTooBroadError(Exception):
+    """
+    Raised when a substring search matches more users than USER_SEARCH_MAX_CANDIDATES.
+    """
+    def __init__(self, max_candidates: int):
+        super().__init__(f"The search matches more than {max_candidates} users")
+        self.max_candidates = max_candidates
+
+
+class UserRepository(BaseRepository):
     """
     Repository class for User CRUD operations.
     Encapsulates all database interactions related to the User model.
     """
-    def __init__(self, db: Session):
-        self.db = db
-
-    def get_user_by_username(self, username: str) -> Optional[models.User]:
+    async def get_user_by_username(self, username: str) -> Optional[models.User]:
         """
-        Retrieves a user by their username.
+        Retrieves a user by their username, as an instance attached to the session.
+        Not cached: meant for the writes that need the instance, reads go through
+        get_user_snapshot_by_username and the user cache.
 
         :param username: The username of the user to retrieve.
         :return: User object if found, else None.
         """
-        logger.debug(f"Fetching user by username: {username}")
-        return self.db.query(models.User).filter(models.User.username == username).first()
+        logger.debug("Fetching user by username: %s", username)
+        return await self._run(self._get_user_by_username, username)
+
+    def _get_user_by_username(self, username: str) -> Optional[models.User]:
+        return (
+            self.db.query(models.User)
+            .options(*USER_LOAD_OPTIONS)
+            .filter(models.User.username == username)
+            .first()
+        )
 
-    def get_user_by_email(self, email: str) -> Optional[models.User]:
+    async def get_user_by_email(self, email: str) -> Optional[models.User]:
         """
-        Retrieves a user by their email.
+        Retrieves a user by their email, as an instance attached to the session.
+        Not cached, see get_user_by_username.
 
         :param email: The email of the user to retrieve.
         :return: User object if found, else None.
         """
-        logger.debug(f"Fetching user by email: {email}")
-        return self.db.query(models.User).filter(models.User.email == email).first()
+        logger.debug("Fetching user by email: %s", email)
+        return await self._run(self._get_user_by_email, email)
+
+    def _get_user_by_email(self, email: str) -> Optional[models.User]:
+        return (
+            self.db.query(models.User)
+            .options(*USER_LOAD_OPTIONS)
+            .filter(models.User.email == email)
+            .first()
+        )
+
+    async def get_user_snapshot_by_username(self, username: str) -> Optional[UserSnapshot]:
+        """
+        Retrieves a detached snapshot of a user by their username, served from the user cache when possible.
+
+        :param username: The username of the user to retrieve.
+        :return: UserSnapshot if found, else None.
+        """
+        return get_cached_user("username", username) or await self._run(
+            self._load_user_snapshot, "username", username
+        )
+
+    async def get_user_snapshot_by_email(self, email: str) -> Optional[UserSnapshot]:
+        """
+        Retrieves a detached snapshot of a user by their email, served from the user cache when possible.
+
+        :param email: The email of the user to retrieve.
+        :return: UserSnapshot if found, else None.
+        """
+        return get_cached_user("email", email) or await self._run(self._load_user_snapshot, "email", email)
+
+    async def get_user_snapshots_by_usernames(self, usernames: List[str]) -> Dict[str, UserSnapshot]:
+        """
+        Retrieves snapshots of many users, served from the user cache when possible.
+        The users missing from the cache are loaded with a single query.
+
+        :param usernames: The usernames to look up.
+        :return: Mapping of username to UserSnapshot for the users that exist.
+        """
+        snapshots: Dict[str, UserSnapshot] = {}
+        missing: List[str] = []
+        for username in set(usernames):
+            snapshot = get_cached_user("username", username)
+            if snapshot is not None:
+                snapshots[username] = snapshot
+            else:
+                missing.append(username)
+        if missing:
+            snapshots.update(await self._run(self._load_user_snapshots, missing))
+        return snapshots
+
+    # The snapshots are loaded from the primary, not a replica: they go into the user cache,
+    # which a lagging replica would refill with a deleted user or revoked role for a whole TTL
+    def _load_user_snapshots(self, usernames: List[str]) -> Dict[str, UserSnapshot]:
+        logger.debug("User cache miss for %s usernames", len(usernames))
+        users = (
+            self.db.query(models.User)
+            .options(selectinload(models.User.roles))
+            .filter(models.User.username.in_(usernames))
+            .all()
+        )
+        snapshots = {}
+        for user in users:
+            snapshot = UserSnapshot.from_user(user)
+            cache_user(snapshot)
+            snapshots[user.username] = snapshot
+        return snapshots
+
+    def _load_user_snapshot(self, field: str, value: str) -> Optional[UserSnapshot]:
+        logger.debug("User cache miss for %s: %s", field, value)
+        user = (
+            self.db.query(models.User)
+            .options(selectinload(models.User.roles))
+            .filter(getattr(models.User, field) == value)
+            .first()
+        )
+        if user is None:
+            return None
+        snapshot = UserSnapshot.from_user(user)
+        cache_user(snapshot)
+        return snapshot
 
-    def get_users(self, skip: int = 0, limit: int = 100) -> List[models.User]:
+    async def get_users(self, limit: int = 100, after_username: Optional[str] = None) -> List[models.User]:
         """
-        Retrieves a list of users with pagination.
+        Retrieves a page of users ordered by username (keyset pagination).
+        The cost of a page does not depend on how deep it is.
 
-        :param skip: Number of records to skip.
         :param limit: Maximum number of records to return.
-        :return: List of User objects.
+        :param after_username: Only return users whose username sorts after this one.
+        :return: List of User objects with their roles and services loaded.
         """
-        logger.debug(f"Fetching users with skip={skip} and limit={limit}")
-        return self.db.query(models.User).offset(skip).limit(limit).all()
+        logger.debug("Fetching users after=%s and limit=%s", after_username, limit)
+        return await self._run(self._get_users, limit, after_username, replica=True)
 
-    def create_user(self, user: schemas.UserCreate) -> models.User:
+    def _get_users(self, limit: int, after_username: Optional[str]) -> List[models.User]:
+        query = self.db.query(models.User).options(*USER_LOAD_OPTIONS)
+        if after_username is not None:
+            query = query.filter(models.User.username > after_username)
+        return query.order_by(models.User.username).limit(limit).all()
+
+    async def search_users(
+        self, field: str, term: str, mode: str, limit: int = 20, after: Optional[str] = None
+    ) -> List[models.User]:
+        """
+        Searches users by a case-insensitive prefix or substring of their username or email.
+        Results are ordered by the lowercased field (keyset pagination), the prefix search
+        is a range scan of the search index and the substring search uses the trigram index.
+
+        The trigram index returns the substring matches unordered, so they are all sorted
+        for a page: the substring search first fetches the ids of at most
+        USER_SEARCH_MAX_CANDIDATES matches, and only sorts them if there are no more.
+
+        :param field: "username" or "email".
+        :param term: The text to look for.
+        :param mode: "prefix" or "contains".
+        :param limit: Maximum number of records to return.
+        :param after: Only return users sorting after the one with this field value.
+        :return: List of User objects with their roles and services loaded.
+        :raises SearchTooBroadError: If a substring search matches too many users.
+        """
+        logger.debug("Searching users by %s %s '%s' after=%s and limit=%s", field, mode, term, after, limit)
+        return await self._run(self._search_users, field, term, mode, limit, after, replica=True)
+
+    def _search_users(self, field: str, term: str, mode: str, limit: int, after: Optional[str]) -> List[models.User]:
+        if mode == "prefix":
+            return self._search_query(field, term, mode, limit, after).all()
+        max_candidates = settings.USER_SEARCH_MAX_CANDIDATES
+        candidates = [row.id for row in self._search_candidates_query(field, term, after, max_candidates + 1)]
+        if len(candidates) > max_candidates:
+            raise SearchTooBroadError(max_candidates)
+        if not candidates:
+            return []
+        _, order = self._search_clauses(field, term, mode, after)
+        return (
+            self.db.query(models.User)
+            .options(*USER_LOAD_OPTIONS)
+            .filter(models.User.id.in_(candidates))
+            .order_by(*order)
+            .limit(limit)
+            .all()
+        )
+
+    def _search_query(self, field: str, term: str, mode: str, limit: int, after: Optional[str]) -> Query:
+        filters, order = self._search_clauses(field, term, mode, after)
+        return self.db.query(models.User).options(*USER_LOAD_OPTIONS).filter(*filters).order_by(*order).limit(limit)
+
+    def _search_candidates_query(self, field: str, term: str, after: Optional[str], limit: int) -> Query:
+        # Unordered: the rows are only read until limit matches are found, and nothing is sorted
+        filters, _ = self._search_clauses(field, term, "contains", after)
+        return self.db.query(models.User.id).filter(*filters).limit(limit)
+
+    def _search_clauses(self, field: str, term: str, mode: str, after: Optional[str]) -> Tuple[List[Any], List[Any]]:
+        column = getattr(models.User, field)
+        key = func.lower(column)
+        # Substrings are matched in the default collation, the one of the trigram index:
+        # the planner can't use an index for an expression in another collation
+        matched = key
+        if self.db.get_bind().dialect.name == "postgresql":
+            # Ordered by byte order, as in the prefix search index, whatever the database collation
+            column, key = column.collate("C"), key.collate("C")
+            if mode == "prefix":
+                # LIKE 'abc%' is then a range scan of that index
+                matched = key
+        pattern = escape_like(term.lower())
+        pattern = f"{pattern}%" if mode == "prefix" else f"%{pattern}%"
+        filters = [matched.like(pattern, escape=LIKE_ESCAPE)]
+        if after is not None:
+            # The field is unique, its lowercase may not be
+            filters.append(tuple_(key, column) > tuple_(func.lower(after), after))
+        return filters, [key, column]
+
+    async def create_user(self, user: schemas.UserCreate) -> models.User:
         """
         Creates a new user with hashed password.
+        The password is hashed in the password hashing pool.
 
         :param user: UserCreate schema containing user details.
         :return: The created User object.
         """
-        logger.debug(f"Creating user: {user.username}")
-        hashed_password = pwd_context.hash(user.password)
+        logger.debug("Creating user: %s", user.username)
+        hashed_password = await password_hasher.hash(user.password)
+        return await self._run(self._insert_user, user, hashed_password)
+
+    def _insert_user(self, user: schemas.UserCreate, hashed_password: str) -> models.User:
         db_user = models.User(
             username=user.username,
             email=user.email,
             hashed_password=hashed_password
         )
         self.db.add(db_user)
+        self.db.flush()
+        record_changes(self.db, [user_change("create", db_user.id, db_user.username, db_user.email)])
+        self.db.commit()
+        logger.info("User %s successfully created.", db_user.username)
+        return self._get_user_by_username(db_user.username)
+
+    async def get_existing_usernames_and_emails(
+        self, usernames: List[str], emails: List[str]
+    ) -> Tuple[Set[str], Set[str]]:
+        """
+        Finds which of the given usernames and emails are already taken, in a single query.
+
+        :param usernames: Usernames to check.
+        :param emails: Emails to check.
+        :return: The taken usernames and the taken emails.
+        """
+        logger.debug("Checking %s usernames and %s emails for existing users", len(usernames), len(emails))
+        return await self._run(self._get_existing_usernames_and_emails, usernames, emails)
+
+    def _get_existing_usernames_and_emails(
+        self, usernames: List[str], emails: List[str]
+    ) -> Tuple[Set[str], Set[str]]:
+        rows = self.db.execute(
+            select(models.User.username, models.User.email)
+            .where(or_(models.User.username.in_(usernames), models.User.email.in_(emails)))
+        ).all()
+        return {row.username for row in rows}, {row.email for row in rows}
+
+    async def create_users(self, users: List[schemas.UserCreate]) -> Set[str]:
+        """
+        Creates many users with a single multi-row INSERT and a single commit.
+        Passwords are hashed in parallel in the password hashing pool.
+        Users whose username or email got taken in the meantime are skipped.
+
+        :param users: UserCreate schemas of the users to create.
+        :return: The usernames of the created users.
+        """
+        logger.debug("Creating %s users in bulk", len(users))
+        hashed_passwords = await password_hasher.hash_many([user.password for user in users])
+        rows = [
+            {
+                "id": uuid.uuid4(),
+                "username": user.username,
+                "email": user.email,
+                "hashed_password": hashed_password,
+            }
+            for user, hashed_password in zip(users, hashed_passwords)
+        ]
+        return await self._run(self._insert_users, rows)
+
+    def _insert_users(self, rows: List[dict]) -> Set[str]:
+        if not rows:
+            return set()
+        stmt = (
+            dialect_insert(self.db, models.User)
+            .values(rows)
+            .on_conflict_do_nothing()
+            .returning(models.User.username)
+        )
+        created = set(self.db.execute(stmt).scalars())
+        record_changes(self.db, [
+            user_change("create", row["id"], row["username"], row["email"])
+            for row in rows if row["username"] in created
+        ])
         self.db.commit()
-        self.db.refresh(db_user)
-        logger.info(f"User {db_user.username} successfully created.")
-        return db_user
+        logger.info("%s users successfully created in bulk.", len(created))
+        return created
 
-    def delete_user(self, username: str) -> Optional[models.User]:
+    async def delete_user(self, username: str) -> Optional[models.User]:
         """
         Deletes a user by their username.
 
         :param username: The username of the user to delete.
         :return: The deleted User object if found and deleted, else None.
         """
-        logger.debug(f"Deleting user: {username}")
-        user = self.get_user_by_username(username)
+        logger.debug("Deleting user: %s", username)
+        return await self._run(self._delete_user, username)
+
+    def _delete_user(self, username: str) -> Optional[models.User]:
+        user = self._get_user_by_username(username)
         if user:
             self.db.delete(user)
+            record_changes(self.db, [user_change("delete", user.id, user.username, user.email)])
             self.db.commit()
-            logger.info(f"User {username} successfully deleted.")
+            invalidate_user(user.username, user.email)
+            role_index.remove_user(user.id)
+            logger.info("User %s successfully deleted.", username)
         else:
-            logger.warning(f"Attempted to delete non-existent user: {username}")
+            logger.warning("Attempted to delete non-existent user: %s", username)
         return user
 
-    def add_user_role(self, user: models.User, role: schemas.UserRoleCreate) -> models.UserRole:
+    async def add_user_role(self, user: models.User, role: schemas.UserRoleCreate) -> models.UserRole:
         """
         Adds a role to a user for a specific service.
 
@@ -95,36 +358,311 @@ class UserRepository:
         :param role: UserRoleCreate schema containing role details.
         :return: The created UserRole object.
         """
-        logger.debug(f"Adding role '{role.role}' to user '{user.username}' for service ID {role.service_id}")
+        logger.debug("Adding role '%s' to user '%s' for service ID %s", role.role, user.username, role.service_id)
+        return await self._run(self._add_user_role, user, role)
+
+    def _add_user_role(self, user: models.User, role: schemas.UserRoleCreate) -> models.UserRole:
         user_role = models.UserRole(
             role=role.role,
             service_id=role.service_id,
             user_id=user.id
         )
         self.db.add(user_role)
+        self._touch_users([user.id])
+        record_changes(self.db, [
+            user_role_change("upsert", user.id, user.username, user.email, role.service_id, role.role)
+        ])
         self.db.commit()
         self.db.refresh(user_role)
-        logger.info(f"Role '{user_role.role}' added to user '{user.username}' for service ID {role.service_id}.")
+        invalidate_user(user.username, user.email)
+        role_index.set_roles([(user.id, role.service_id, role.role)])
+        logger.info(
+            "Role '%s' added to user '%s' for service ID %s.", user_role.role, user.username, role.service_id
+        )
         return user_role
 
-    def authenticate_user(self, username: str, password: str) -> Optional[models.User]:
+    async def get_users_by_usernames(self, usernames: List[str]) -> Dict[str, Tuple[uuid.UUID, str]]:
+        """
+        Resolves usernames to user ids in a single query.
+
+        :param usernames: Usernames to resolve.
+        :return: Mapping of the existing usernames to their user id and email.
+        """
+        logger.debug("Resolving %s usernames", len(usernames))
+        return await self._run(self._get_users_by_usernames, usernames)
+
+    def _get_users_by_usernames(self, usernames: List[str]) -> Dict[str, Tuple[uuid.UUID, str]]:
+        rows = self.db.execute(
+            select(models.User.id, models.User.username, models.User.email)
+            .where(models.User.username.in_(usernames))
+        ).all()
+        return {row.username: (row.id, row.email) for row in rows}
+
+    async def get_existing_service_ids(self, service_ids: List[Any]) -> Set[Any]:
+        """
+        Finds which of the given service ids exist, in a single query.
+
+        :param service_ids: Service ids to check.
+        :return: The existing service ids.
+        """
+        return await self._run(self._get_existing_service_ids, service_ids)
+
+    def _get_existing_service_ids(self, service_ids: List[Any]) -> Set[Any]:
+        return set(self.db.execute(
+            select(models.Service.id).where(models.Service.id.in_(service_ids))
+        ).scalars())
+
+    async def upsert_user_roles(self, rows: List[Dict[str, Any]], users: Dict[uuid.UUID, Tuple[str, str]]) -> int:
+        """
+        Assigns roles in a single INSERT ... ON CONFLICT (user_id, service_id) DO UPDATE and commits.
+        An existing role of a user in a service is replaced.
+
+        :param rows: Dicts with user_id, service_id and role, at most one per user and service.
+        :param users: The affected users, user id to (username, email), for the change feed and the caches.
+        :return: Number of assigned roles.
+        """
+        logger.debug("Upserting %s user roles", len(rows))
+        return await self._run(self._upsert_user_roles, rows, users)
+
+    def _upsert_user_roles(self, rows: List[Dict[str, Any]], users: Dict[uuid.UUID, Tuple[str, str]]) -> int:
+        if not rows:
+            return 0
+        stmt = dialect_insert(self.db, models.UserRole).values(
+            [{"id": uuid.uuid4(), **row} for row in rows]
+        )
+        # Same columns as the uix_user_service unique constraint
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[models.UserRole.user_id, models.UserRole.service_id],
+            set_={"role": stmt.excluded.role},
+        )
+        self.db.execute(stmt)
+        self._touch_users({row["user_id"] for row in rows})
+        record_changes(self.db, [
+            user_role_change("upsert", row["user_id"], *users[row["user_id"]], row["service_id"], row["role"])
+            for row in rows
+        ])
+        self.db.commit()
+        for username, email in users.values():
+            invalidate_user(username, email)
+        role_index.set_roles((row["user_id"], row["service_id"], row["role"]) for row in rows)
+        logger.info("%s user roles assigned in bulk.", len(rows))
+        return len(rows)
+
+    async def delete_user_roles(
+        self, pairs: List[Tuple[uuid.UUID, Any]], users: Dict[uuid.UUID, Tuple[str, str]]
+    ) -> int:
+        """
+        Revokes the roles of users in services with a single DELETE and commits.
+
+        :param pairs: (user_id, service_id) pairs to revoke.
+        :param users: The affected users, user id to (username, email), for the change feed and the caches.
+        :return: Number of revoked roles.
+        """
+        logger.debug("Deleting %s user roles", len(pairs))
+        return await self._run(self._delete_user_roles, pairs, users)
+
+    def _delete_user_roles(
+        self, pairs: List[Tuple[uuid.UUID, Any]], users: Dict[uuid.UUID, Tuple[str, str]]
+    ) -> int:
+        if not pairs:
+            return 0
+        revoked = self.db.execute(
+            delete(models.UserRole)
+            .where(tuple_(models.UserRole.user_id, models.UserRole.service_id).in_(pairs))
+            .returning(models.UserRole.user_id, models.UserRole.service_id)
+            .execution_options(synchronize_session=False)
+        ).all()
+        self._touch_users({user_id for user_id, _ in revoked})
+        record_changes(self.db, [
+            user_role_change("delete", user_id, *users[user_id], service_id) for user_id, service_id in revoked
+        ])
+        self.db.commit()
+        for username, email in users.values():
+            invalidate_user(username, email)
+        role_index.set_roles((user_id, service_id, None) for user_id, service_id in revoked)
+        logger.info("%s user roles revoked in bulk.", len(revoked))
+        return len(revoked)
+
+    def _touch_users(self, user_ids: Iterable[uuid.UUID]) -> None:
+        # A role change is a change of the user for the export watermark
+        self.db.execute(
+            update(models.User)
+            .where(models.User.id.in_(list(user_ids)))
+            .values(updated_at=func.now())
+            .execution_options(synchronize_session=False)
+        )
+
+    async def stream_user_export_rows(
+        self,
+        service_id: Optional[uuid.UUID] = None,
+        updated_since: Optional[datetime] = None,
+        batch_size: int = settings.EXPORT_BATCH_SIZE,
+    ) -> AsyncIterator[List[Row]]:
+        """
+        Streams the users joined with their roles, ordered by user id, through a
+        server-side cursor, on a read replica when there is one. Only batch_size
+        rows are held in memory at a time, the rows of a user may span two batches.
+
+        :param service_id: Only export the users with a role in this service, and only that role.
+        :param updated_since: Only export the users changed at or after this time.
+        :param batch_size: Number of rows fetched from the cursor at a time.
+        :return: Batches of rows with id, username, email, updated_at, service_id and role.
+        """
+        stmt = select(
+            models.User.id,
+            models.User.username,
+            models.User.email,
+            models.User.updated_at,
+            models.UserRole.service_id,
+            models.UserRole.role,
+        )
+        if service_id is not None:
+            stmt = stmt.join(models.UserRole, models.UserRole.user_id == models.User.id).where(
+                models.UserRole.service_id == service_id
+            )
+        else:
+            stmt = stmt.outerjoin(models.UserRole, models.UserRole.user_id == models.User.id)
+        if updated_since is not None:
+            stmt = stmt.where(models.User.updated_at >= updated_since)
+        # yield_per fetches through a server-side cursor (stream_results) in batches
+        stmt = stmt.order_by(models.User.id).execution_options(yield_per=batch_size)
+
+        if self.async_db is not None:
+            with self._on_replica():
+                result = await self.async_db.stream(stmt)
+            try:
+                async for partition in result.partitions():
+                    yield partition
+            finally:
+                await result.close()
+        else:
+            result = await run_in_threadpool(self._call_on_replica, self.db.execute, stmt)
+            try:
+                partitions = result.partitions()
+                while True:
+                    partition = await run_in_threadpool(next, partitions, None)
+                    if partition is None:
+                        break
+                    yield partition
+            finally:
+                result.close()
+
+    async def get_role_assignments(self) -> List[Tuple[uuid.UUID, uuid.UUID, str]]:
+        """
+        Retrieves every role assignment, selecting only the three columns.
+
+        :return: (user_id, service_id, role) triples.
+        """
+        return await self._run(self._get_role_assignments)
+
+    def _get_role_assignments(self) -> List[Tuple[uuid.UUID, uuid.UUID, str]]:
+        rows = self.db.execute(
+            select(models.UserRole.user_id, models.UserRole.service_id, models.UserRole.role)
+        ).all()
+        return [tuple(row) for row in rows]
+
+    async def authenticate_user(self, username: str, password: str) -> Optional[models.User]:
         """
         Authenticates a user by verifying their username and password.
+        A single query fetches only the id and the password hash, matching either
+        the username or the email, and the connection goes back to the pool right
+        after it. The full user is only loaded once the password has been verified
+        in the password hashing pool. A hash that doesn't follow the hashing
+        policy anymore is replaced in the background, the login doesn't wait for it.
+
+        Failed logins are throttled per user id (login_username_limiter): the
+        attempt takes a token before the password is verified and a successful
+        one gives it back, so only wrong passwords spend the user's budget.
 
         :param username: The username or email of the user.
         :param password: The plaintext password to verify.
         :return: The User object if authentication is successful, else None.
+        :raises HashingQueueFullError: If the password hashing pool is saturated.
+        :raises RateLimitExceededError: If the user has too many recent failed logins.
         """
-        logger.debug(f"Authenticating user: {username}")
-        user = self.get_user_by_username(username)
-        if not user:
-            logger.debug(f"User '{username}' not found. Attempting to fetch by email.")
-            user = self.get_user_by_email(username)  # Allows login via email
-        if not user:
-            logger.warning(f"Authentication failed: User '{username}' not found.")
+        logger.debug("Authenticating user: %s", username)
+        credentials = await self._run(self._get_credentials, username)
+        if not credentials:
+            logger.warning("Authentication failed: User '%s' not found.", username)
             return None
-        if not pwd_context.verify(password, user.hashed_password):
-            logger.warning(f"Authentication failed: Incorrect password for user '{username}'.")
+        login_username_limiter.check(credentials.id)
+        try:
+            verified, needs_update = await password_hasher.verify_and_check_policy(
+                password, credentials.hashed_password
+            )
+        except HashingQueueFullError:
+            login_username_limiter.refund(credentials.id)
+            raise
+        if not verified:
+            logger.warning("Authentication failed: Incorrect password for user '%s'.", username)
             return None
-        logger.info(f"User '{username}' successfully authenticated.")
-        return user
+        login_username_limiter.refund(credentials.id)
+        logger.info("User '%s' successfully authenticated.", username)
+        if needs_update and settings.PASSWORD_REHASH_ON_LOGIN:
+            run_in_background(
+                rehash_password(credentials.id, password, credentials.hashed_password), f"rehash-{credentials.id}"
+            )
+        return await self._run(self._get_user_by_id, credentials.id)
+
+    def _get_credentials(self, username_or_email: str) -> Optional[Any]:
+        # Allows login via email, a username match wins over an email match
+        credentials = self.db.execute(
+            select(models.User.id, models.User.hashed_password)
+            .where(or_(models.User.username == username_or_email, models.User.email == username_or_email))
+            .order_by((models.User.username == username_or_email).desc())
+            .limit(1)
+        ).first()
+        # End the read-only transaction so that the pooled connection is not held
+        # while the password is verified, which takes far longer than the query.
+        self.db.rollback()
+        return credentials
+
+    async def update_password_hash(self, user_id: uuid.UUID, old_hash: str, new_hash: str) -> bool:
+        """
+        Replaces the password hash of a user, unless the password changed in the meantime.
+
+        :param user_id: The id of the user.
+        :param old_hash: The hash the new one replaces.
+        :param new_hash: The new password hash.
+        :return: True if the hash was replaced.
+        """
+        return await self._run(self._update_password_hash, user_id, old_hash, new_hash)
+
+    def _update_password_hash(self, user_id: uuid.UUID, old_hash: str, new_hash: str) -> bool:
+        # updated_at is kept: the hash isn't exported, a rehash must not re-export the user
+        result = self.db.execute(
+            update(models.User)
+            .where(models.User.id == user_id, models.User.hashed_password == old_hash)
+            .values(hashed_password=new_hash, updated_at=models.User.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+        self.db.commit()
+        return result.rowcount == 1
+
+    def _get_user_by_id(self, user_id: uuid.UUID) -> Optional[models.User]:
+        return (
+            self.db.query(models.User)
+            .options(*USER_LOAD_OPTIONS)
+            .filter(models.User.id == user_id)
+            .first()
+        )
+
+
+async def rehash_password(user_id: uuid.UUID, password: str, old_hash: str) -> None:
+    """
+    Hashes a password with the current policy and stores it, in its own session.
+    Meant to run in the background after a successful login. It is skipped if
+    the hashing pool is saturated, the next login will try again.
+
+    :param user_id: The id of the user.
+    :param password: The verified plaintext password.
+    :param old_hash: The outdated hash to replace.
+    """
+    try:
+        new_hash = await password_hasher.hash(password)
+    except HashingQueueFullError:
+        logger.info("Rehash of the password of user %s skipped, the hashing pool is busy.", user_id)
+        return
+    async with session_scope() as db:
+        if await UserRepository(db).update_password_hash(user_id, old_hash, new_hash):
+            logger.info("Password hash of user %s updated to the current policy.", user_id)
@@ -1,22 +1,134 @@
-from fastapi import FastAPI
+# Imported first, so that the import time of the application is measured
+from app.core.startup import startup_state
 
-from app.api.deps import engine
-from app.api.v1 import auth, users
-from app.core.logging_config import setup_logging
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+
+from app.api.deps import async_engine, engine, replica_router, warm_up_pool
+from app.api.v1 import auth, authorization, changes, health, internal, jwks, metrics, users
+from app.core.background import cancel_background_tasks, run_in_background
+from app.core.change_feed import change_follower
+from app.core.hashing import HashingQueueFullError, password_hasher
+from app.core.keys import key_ring
+from app.core.metrics import MetricsMiddleware, mark_process_dead
+from app.core.sql_instrumentation import SqlInstrumentationMiddleware
+from app.core.rate_limit import RateLimitExceededError
+from app.core.revocation import sync_revocations, sync_revocations_periodically
+from app.core.role_sync import sync_role_index, sync_role_index_periodically
+from app.core.settings import settings
+from app.core.logging_config import setup_logging, stop_logging
 from app.models import Base
 
 # Инициализируем логирование
 logger = setup_logging()
+startup_state.mark_imported()
+
+
+async def prepare_database() -> None:
+    if settings.DB_CREATE_ALL:
+        with startup_state.step("create_all"):
+            await run_in_threadpool(Base.metadata.create_all, bind=engine)
+    with startup_state.step("db_pool"):
+        connections = settings.DB_WARMUP_CONNECTIONS
+        await warm_up_pool(settings.DB_POOL_SIZE if connections is None else connections)
+    if replica_router:
+        with startup_state.step("replicas"):
+            await replica_router.check()
+    with startup_state.step("revocations"):
+        await sync_revocations()
+    # The feed is followed from before the role index is loaded, so that no change falls in between
+    with startup_state.step("change_feed"):
+        await change_follower.start()
+    with startup_state.step("role_index"):
+        await sync_role_index()
+
+
+async def prepare_password_hashing() -> None:
+    with startup_state.step("password_hashing"):
+        await password_hasher.warm_up()
+
+
+async def prepare_signing_keys() -> None:
+    if key_ring is not None:
+        with startup_state.step("signing_keys"):
+            await run_in_threadpool(key_ring.reload)
+
 
-app = FastAPI(title="Сервис Авторизации")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    # The warm-up steps are independent, the database ones run in order
+    await asyncio.gather(prepare_database(), prepare_password_hashing(), prepare_signing_keys())
+    if key_ring is not None:
+        run_in_background(key_ring.reload_periodically(settings.JWT_KEYS_RELOAD_SECONDS), "reload-signing-keys")
+    run_in_background(sync_revocations_periodically(settings.REVOCATION_SYNC_SECONDS), "sync-revocations")
+    run_in_background(sync_role_index_periodically(settings.ROLE_INDEX_REBUILD_SECONDS), "rebuild-role-index")
+    run_in_background(change_follower.run(settings.CHANGE_FEED_POLL_SECONDS), "follow-changes")
+    if replica_router:
+        run_in_background(
+            replica_router.check_periodically(settings.DB_REPLICA_HEALTH_CHECK_SECONDS), "check-replicas"
+        )
+    startup_state.mark_ready(started)
+    logger.info(
+        "Application imported in %.0f ms, ready in %.0f ms (%s).",
+        startup_state.import_ms,
+        startup_state.startup_ms,
+        ", ".join(f"{name} {ms:.0f} ms" for name, ms in startup_state.steps.items()),
+    )
 
-# Создание таблиц при запуске (можно убрать после миграций)
-Base.metadata.create_all(bind=engine)
-logger.info("Запуск приложения и создание таблиц, если необходимо.")
+    yield
+
+    # Fail the readiness probe first, so that no new traffic is routed here while shutting down
+    startup_state.ready = False
+    cancel_background_tasks()
+    mark_process_dead()
+    password_hasher.shutdown()
+    if async_engine is not None:
+        await async_engine.dispose()
+    await replica_router.dispose()
+    stop_logging()
+
+
+app = FastAPI(title="Сервис Авторизации", lifespan=lifespan)
 
 # Включение маршрутизаторов API
 app.include_router(auth.router, prefix="/api/v1", tags=["auth"])
 app.include_router(users.router, prefix="/api/v1", tags=["users"])
+app.include_router(authorization.router, prefix="/api/v1", tags=["authorization"])
+app.include_router(changes.router, prefix="/api/v1", tags=["changes"])
+app.include_router(internal.router, prefix="/api/v1", tags=["internal"])
+app.include_router(jwks.router, tags=["jwks"])
+app.include_router(health.router, tags=["health"])
+
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics.router, tags=["metrics"])
+if settings.SQL_INSTRUMENTATION:
+    app.add_middleware(SqlInstrumentationMiddleware)
+
+
+@app.exception_handler(HashingQueueFullError)
+async def hashing_queue_full_handler(request: Request, exc: HashingQueueFullError):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "The service is overloaded, try again later"},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.exception_handler(RateLimitExceededError)
+async def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceededError):
+    logger.warning("Rate limit exceeded on %s, retry after %.1f seconds.", request.url.path, exc.retry_after)
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={"detail": "Too many attempts, try again later"},
+        headers={"Retry-After": exc.retry_after_header},
+    )
 
 
 @app.get("/")
@@ -1,6 +1,8 @@
-from models.base import Base
-from models.user_models import User
-from models.service_models import Service
-from models.user_role_models import UserRole
+from app.models.base import Base
+from app.models.user_models import User
+from app.models.service_models import Service
+from app.models.user_role_models import UserRole
+from app.models.token_models import RefreshToken, RevokedToken
+from app.models.change_models import ChangeEvent
 
-__all__ = ["Base", "User", "Service", "UserRole"]
+__all__ = ["Base", "User", "Service", "UserRole", "RefreshToken", "RevokedToken", "ChangeEvent"]
@@ -0,0 +1,66 @@
+from __future__ import annotations
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import BigInteger, DateTime, Integer, String, func
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class ChangeEvent(Base):
+    """
+    A mutation of a user or of a user role, written in the transaction of the mutation.
+    The versions grow in commit order, so a consumer can resume from the last one it saw.
+    """
+    __tablename__ = "change_events"
+
+    version: Mapped[int] = mapped_column(
+        BigInteger().with_variant(Integer, "sqlite"),
+        primary_key=True,
+        autoincrement=True,
+        comment="Position of the change in the feed"
+    )
+    entity: Mapped[str] = mapped_column(
+        String,
+        nullable=False,
+        comment="What changed: user or user_role"
+    )
+    operation: Mapped[str] = mapped_column(
+        String,
+        nullable=False,
+        comment="create or delete for a user, upsert or delete for a user role"
+    )
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        nullable=False,
+        comment="The user that changed, not a foreign key so that deletions stay in the feed"
+    )
+    username: Mapped[str] = mapped_column(
+        String,
+        nullable=False,
+        comment="Username of the user"
+    )
+    email: Mapped[str] = mapped_column(
+        String,
+        nullable=False,
+        comment="Email address of the user"
+    )
+    service_id: Mapped[Optional[uuid.UUID]] = mapped_column(
+        UUID(as_uuid=True),
+        nullable=True,
+        comment="The service of a user role change"
+    )
+    role: Mapped[Optional[str]] = mapped_column(
+        String,
+        nullable=True,
+        comment="The new role of an upserted user role"
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+        comment="When the change was recorded"
+    )
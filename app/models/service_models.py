@@ -1,13 +1,15 @@
 from __future__ import annotations
 import uuid
-from typing import List
+from typing import TYPE_CHECKING, List
 
 from sqlalchemy import String
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from app.models import Base
-from app.schemas import UserRole
+from app.models.base import Base
+
+if TYPE_CHECKING:
+    from app.models.user_role_models import UserRole
 
 
 class Service(Base):
@@ -35,6 +37,5 @@ class Service(Base):
     user_roles: Mapped[List[UserRole]] = relationship(
         "UserRole",
         back_populates="service",
-        cascade="all, delete-orphan",
-        comment="User roles associated with the service"
+        cascade="all, delete-orphan"
     )
\ No newline at end of file
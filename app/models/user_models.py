@@ -1,13 +1,16 @@
 from __future__ import annotations
 import uuid
-from typing import List
+from datetime import datetime
+from typing import TYPE_CHECKING, List
 
-from sqlalchemy import String
+from sqlalchemy import DateTime, String, func
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models.base import Base
-from app.schemas import UserRole
+
+if TYPE_CHECKING:
+    from app.models.user_role_models import UserRole
 
 
 class User(Base):
@@ -15,6 +18,8 @@ class User(Base):
     Represents a user in the system.
     """
     __tablename__ = "users"
+    # The search indexes on username and email (lower() with the "C" collation,
+    # and pg_trgm) are Postgres-only and only created by the migrations
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
@@ -43,10 +48,17 @@ class User(Base):
         nullable=False,
         comment="Hashed password of the user"
     )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        index=True,
+        nullable=False,
+        comment="Last change of the user or of their roles, the export watermark"
+    )
 
     roles: Mapped[List[UserRole]] = relationship(
         "UserRole",
         back_populates="user",
-        cascade="all, delete-orphan",
-        comment="Roles associated with the user"
+        cascade="all, delete-orphan"
     )
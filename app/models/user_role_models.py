@@ -1,7 +1,7 @@
 from __future__ import annotations
 import uuid
 
-from sqlalchemy import String, ForeignKey, UniqueConstraint
+from sqlalchemy import Index, String, ForeignKey, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -15,7 +15,11 @@ class UserRole(Base):
     Ensures that each user-service pair is unique.
     """
     __tablename__ = "user_roles"
-    __table_args__ = (UniqueConstraint('user_id', 'service_id', name='uix_user_service'),)
+    __table_args__ = (
+        UniqueConstraint('user_id', 'service_id', name='uix_user_service'),
+        # Members of a service, optionally with a given role
+        Index('ix_user_roles_service_id_role', 'service_id', 'role'),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
@@ -9,7 +9,24 @@ from app.schemas.user_schemas import (
     UserBase,
     UserCreate,
     User,
+    UserPage,
+    BulkUserResult,
+    BulkUserResponse,
+    UserServiceRef,
+    UserRoleAssignment,
+    BulkRoleResponse,
     Token,
+    RefreshTokenRequest,
+    TokenRevocationRequest,
+    TokenIntrospectionRequest,
+    TokenIntrospection,
+    TokenIntrospectionResponse,
+    AuthorizationCheck,
+    AuthorizationDecision,
+    AuthorizationBatchRequest,
+    AuthorizationBatchResponse,
+    Change,
+    ChangeFeed,
     TokenData
 )
 
@@ -23,6 +40,23 @@ __all__ = [
     "UserBase",
     "UserCreate",
     "User",
+    "UserPage",
+    "BulkUserResult",
+    "BulkUserResponse",
+    "UserServiceRef",
+    "UserRoleAssignment",
+    "BulkRoleResponse",
     "Token",
+    "RefreshTokenRequest",
+    "TokenRevocationRequest",
+    "TokenIntrospectionRequest",
+    "TokenIntrospection",
+    "TokenIntrospectionResponse",
+    "AuthorizationCheck",
+    "AuthorizationDecision",
+    "AuthorizationBatchRequest",
+    "AuthorizationBatchResponse",
+    "Change",
+    "ChangeFeed",
     "TokenData",
 ]
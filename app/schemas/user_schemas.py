@@ -1,4 +1,5 @@
-from typing import List, Optional
+import uuid
+from typing import Dict, List, Optional
 from pydantic import BaseModel, EmailStr
 
 
@@ -11,15 +12,15 @@ class ServiceCreate(ServiceBase):
 
 
 class Service(ServiceBase):
-    id: int
+    id: uuid.UUID
 
     class Config:
-        orm_mode = True
+        from_attributes = True
 
 
 class UserRoleBase(BaseModel):
     role: str
-    service_id: int
+    service_id: uuid.UUID
 
 
 class UserRoleCreate(UserRoleBase):
@@ -27,11 +28,11 @@ class UserRoleCreate(UserRoleBase):
 
 
 class UserRole(UserRoleBase):
-    id: int
+    id: uuid.UUID
     service: Service
 
     class Config:
-        orm_mode = True
+        from_attributes = True
 
 
 class UserBase(BaseModel):
@@ -44,17 +45,120 @@ class UserCreate(UserBase):
 
 
 class User(UserBase):
-    id: int
+    id: uuid.UUID
     roles: List[UserRole] = []
 
     class Config:
-        orm_mode = True
+        from_attributes = True
+
+
+class UserPage(BaseModel):
+    items: List[User]
+    next_cursor: Optional[str] = None
+
+
+class BulkUserResult(BaseModel):
+    index: int
+    username: Optional[str] = None
+    status: str  # "created", "exists", "duplicate" or "invalid"
+    detail: Optional[str] = None
+
+
+class BulkUserResponse(BaseModel):
+    created: int
+    skipped: int
+    failed: int
+    results: List[BulkUserResult]
+
+
+class UserServiceRef(BaseModel):
+    username: str
+    service_id: uuid.UUID
+
+
+class UserRoleAssignment(UserServiceRef):
+    role: str
+
+
+class BulkRoleResponse(BaseModel):
+    requested: int
+    applied: int
+    unknown_users: List[str] = []
+    unknown_services: List[str] = []
 
 
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
+
+
+class TokenRevocationRequest(BaseModel):
+    token: str
+
+
+class TokenIntrospectionRequest(BaseModel):
+    tokens: List[str]
+
+
+class TokenIntrospection(BaseModel):
+    active: bool
+    sub: Optional[str] = None
+    user_id: Optional[str] = None
+    roles: Dict[str, str] = {}
+    exp: Optional[int] = None
+
+
+class TokenIntrospectionResponse(BaseModel):
+    results: List[TokenIntrospection]
+
+
+class AuthorizationCheck(BaseModel):
+    user_id: uuid.UUID
+    service_id: uuid.UUID
+    role: Optional[str] = None  # any role in the service when omitted
+
+
+class AuthorizationDecision(BaseModel):
+    allowed: bool
+    role: Optional[str] = None
+
+
+class AuthorizationBatchRequest(BaseModel):
+    checks: List[AuthorizationCheck]
+
+
+class AuthorizationBatchResponse(BaseModel):
+    results: List[AuthorizationDecision]
+
+
+class Change(BaseModel):
+    version: int
+    entity: str  # "user" or "user_role"
+    operation: str  # "create" or "delete" for a user, "upsert" or "delete" for a user role
+    user_id: uuid.UUID
+    username: str
+    email: str
+    service_id: Optional[uuid.UUID] = None
+    role: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class ChangeFeed(BaseModel):
+    changes: List[Change]
+    next_since: int
+    has_more: bool
 
 
 class TokenData(BaseModel):
     username: Optional[str] = None
+    user_id: Optional[str] = None
+    roles: Dict[str, str] = {}
+    claims_version: Optional[int] = None
+    jti: Optional[str] = None
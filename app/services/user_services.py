@@ -1,9 +1,18 @@
+import csv
+import io
+import json
 import logging
-from typing import List, Optional
+import uuid
+from datetime import datetime
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, Optional, Tuple
 
-from sqlalchemy.orm import Session
+from pydantic import ValidationError
 
 from app import crud, schemas, models
+from app.api.deps import DbSession
+from app.core.settings import settings
+from app.crud.pagination import decode_cursor, encode_cursor
+from app.crud.user_cache import UserSnapshot
 
 logger = logging.getLogger("auth_service.services.user_service")
 
@@ -13,10 +22,10 @@ class UserService:
     Service class for handling user-related business logic.
     Utilizes the UserRepository for data access operations.
     """
-    def __init__(self, db: Session):
+    def __init__(self, db: DbSession):
         self.user_repo = crud.UserRepository(db)
 
-    def authenticate_user(self, username_or_email: str, password: str) -> Optional[models.User]:
+    async def authenticate_user(self, username_or_email: str, password: str) -> Optional[models.User]:
         """
         Authenticates a user by verifying their credentials.
 
@@ -24,41 +33,210 @@ class UserService:
         :param password: The plaintext password of the user.
         :return: The authenticated User object if successful, else None.
         """
-        logger.debug(f"Service authentication for user: {username_or_email}")
-        return self.user_repo.authenticate_user(username_or_email, password)
+        logger.debug("Service authentication for user: %s", username_or_email)
+        return await self.user_repo.authenticate_user(username_or_email, password)
 
-    def create_user(self, user_create: schemas.UserCreate) -> models.User:
+    async def create_user(self, user_create: schemas.UserCreate) -> models.User:
         """
         Creates a new user.
 
         :param user_create: UserCreate schema containing user details.
         :return: The created User object.
         """
-        logger.debug(f"Service creating user: {user_create.username}")
-        return self.user_repo.create_user(user_create)
+        logger.debug("Service creating user: %s", user_create.username)
+        return await self.user_repo.create_user(user_create)
 
-    def get_users(self, skip: int = 0, limit: int = 100) -> List[models.User]:
+    async def bulk_create_users(
+        self, items: AsyncIterable[Any], chunk_size: int = settings.BULK_CHUNK_SIZE
+    ) -> schemas.BulkUserResponse:
         """
-        Retrieves a list of users with pagination.
+        Creates users in bulk, one chunk at a time.
+        Each chunk costs one query for the existing usernames and emails,
+        parallel password hashing, one multi-row insert and one commit.
+
+        :param items: User payloads, either dicts or raw JSON documents (e.g. NDJSON lines).
+        :param chunk_size: Number of users inserted and committed together.
+        :return: Counters and the per-item results, in input order.
+        """
+        results: List[schemas.BulkUserResult] = []
+        seen_usernames: set = set()
+        seen_emails: set = set()
+        chunk: List[Tuple[int, schemas.UserCreate]] = []
+        index = 0
+        async for item in items:
+            try:
+                if isinstance(item, (str, bytes)):
+                    user = schemas.UserCreate.model_validate_json(item)
+                else:
+                    user = schemas.UserCreate.model_validate(item)
+            except ValidationError as e:
+                detail = "; ".join(
+                    f"{'.'.join(map(str, err['loc']))}: {err['msg']}" if err["loc"] else err["msg"]
+                    for err in e.errors()
+                )
+                results.append(schemas.BulkUserResult(index=index, status="invalid", detail=detail))
+            else:
+                if user.username in seen_usernames or user.email in seen_emails:
+                    results.append(schemas.BulkUserResult(
+                        index=index, username=user.username, status="duplicate",
+                        detail="The username or email is repeated in the request"
+                    ))
+                else:
+                    seen_usernames.add(user.username)
+                    seen_emails.add(user.email)
+                    chunk.append((index, user))
+                    if len(chunk) >= chunk_size:
+                        results.extend(await self._create_users_chunk(chunk))
+                        chunk = []
+            index += 1
+        if chunk:
+            results.extend(await self._create_users_chunk(chunk))
+
+        results.sort(key=lambda result: result.index)
+        created = sum(1 for result in results if result.status == "created")
+        failed = sum(1 for result in results if result.status == "invalid")
+        logger.debug("Service bulk created %s of %s users", created, len(results))
+        return schemas.BulkUserResponse(
+            created=created,
+            skipped=len(results) - created - failed,
+            failed=failed,
+            results=results,
+        )
+
+    async def _create_users_chunk(
+        self, chunk: List[Tuple[int, schemas.UserCreate]]
+    ) -> List[schemas.BulkUserResult]:
+        taken_usernames, taken_emails = await self.user_repo.get_existing_usernames_and_emails(
+            [user.username for _, user in chunk], [user.email for _, user in chunk]
+        )
+        new_users = [
+            user for _, user in chunk
+            if user.username not in taken_usernames and user.email not in taken_emails
+        ]
+        created = await self.user_repo.create_users(new_users)
+        return [
+            schemas.BulkUserResult(index=index, username=user.username, status="created")
+            if user.username in created else
+            schemas.BulkUserResult(
+                index=index, username=user.username, status="exists", detail="The user already exists"
+            )
+            for index, user in chunk
+        ]
+
+    async def get_users(
+        self, limit: int = 100, cursor: Optional[str] = None
+    ) -> Tuple[List[models.User], Optional[str]]:
+        """
+        Retrieves a page of users with cursor-based pagination.
 
-        :param skip: Number of records to skip.
         :param limit: Maximum number of records to return.
-        :return: List of User objects.
+        :param cursor: Opaque cursor of the previous page, None for the first page.
+        :return: The users of the page and the cursor of the next page, None on the last page.
+        :raises ValueError: If the cursor is malformed.
+        """
+        logger.debug("Service fetching users with cursor=%s and limit=%s", cursor, limit)
+        after_username = decode_cursor(cursor) if cursor else None
+        users = await self.user_repo.get_users(limit=limit + 1, after_username=after_username)
+        if len(users) <= limit:
+            return users, None
+        users = users[:limit]
+        return users, encode_cursor(users[-1].username)
+
+    async def search_users(
+        self, term: str, field: str = "username", mode: str = "prefix", limit: int = 20, cursor: Optional[str] = None
+    ) -> Tuple[List[models.User], Optional[str]]:
+        """
+        Searches users with cursor-based pagination.
+
+        :param term: The text to look for, case-insensitive.
+        :param field: "username" or "email".
+        :param mode: "prefix" or "contains".
+        :param limit: Maximum number of records to return.
+        :param cursor: Opaque cursor of the previous page, None for the first page.
+        :return: The users of the page and the cursor of the next page, None on the last page.
+        :raises ValueError: If the cursor is malformed.
+        :raises SearchTooBroadError: If a substring search matches too many users.
+        """
+        logger.debug("Service searching users by %s %s '%s' with cursor=%s", field, mode, term, cursor)
+        after = decode_cursor(cursor) if cursor else None
+        users = await self.user_repo.search_users(field, term, mode, limit=limit + 1, after=after)
+        if len(users) <= limit:
+            return users, None
+        users = users[:limit]
+        return users, encode_cursor(getattr(users[-1], field))
+
+    async def export_users(
+        self,
+        export_format: str = "ndjson",
+        service_id: Optional[uuid.UUID] = None,
+        updated_since: Optional[datetime] = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        Exports the users and their roles as encoded chunks, one chunk per cursor batch.
+        NDJSON has one line per user with their roles, CSV one line per role
+        assignment (a user without roles has one line with an empty service and role).
+
+        :param export_format: "ndjson" or "csv".
+        :param service_id: Only export the users with a role in this service, and only that role.
+        :param updated_since: Only export the users changed at or after this time.
+        :return: The encoded chunks.
         """
-        logger.debug(f"Service fetching users with skip={skip} and limit={limit}")
-        return self.user_repo.get_users(skip=skip, limit=limit)
+        logger.debug(
+            "Service exporting users as %s, service=%s, updated_since=%s", export_format, service_id, updated_since
+        )
+        batches = self.user_repo.stream_user_export_rows(service_id=service_id, updated_since=updated_since)
+        if export_format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(("id", "username", "email", "updated_at", "service_id", "role"))
+            async for rows in batches:
+                writer.writerows(
+                    (
+                        row.id, row.username, row.email, row.updated_at.isoformat(),
+                        row.service_id or "", row.role or "",
+                    )
+                    for row in rows
+                )
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue().encode("utf-8")  # only the header, nothing matched
+            return
 
-    def delete_user(self, username: str) -> Optional[models.User]:
+        # The rows of a user are consecutive, a user is written once their last row is seen
+        current: Optional[Dict[str, Any]] = None
+        async for rows in batches:
+            lines = []
+            for row in rows:
+                if current is None or current["id"] != str(row.id):
+                    if current is not None:
+                        lines.append(json.dumps(current))
+                    current = {
+                        "id": str(row.id),
+                        "username": row.username,
+                        "email": row.email,
+                        "updated_at": row.updated_at.isoformat(),
+                        "roles": [],
+                    }
+                if row.role is not None:
+                    current["roles"].append({"service_id": str(row.service_id), "role": row.role})
+            if lines:
+                yield ("\n".join(lines) + "\n").encode("utf-8")
+        if current is not None:
+            yield (json.dumps(current) + "\n").encode("utf-8")
+
+    async def delete_user(self, username: str) -> Optional[models.User]:
         """
         Deletes a user by their username.
 
         :param username: The username of the user to delete.
         :return: The deleted User object if successful, else None.
         """
-        logger.debug(f"Service deleting user: {username}")
-        return self.user_repo.delete_user(username)
+        logger.debug("Service deleting user: %s", username)
+        return await self.user_repo.delete_user(username)
 
-    def add_user_role(self, username: str, role_create: schemas.UserRoleCreate) -> Optional[models.UserRole]:
+    async def add_user_role(self, username: str, role_create: schemas.UserRoleCreate) -> Optional[models.UserRole]:
         """
         Adds a role to a user for a specific service.
 
@@ -66,19 +244,98 @@ class UserService:
         :param role_create: UserRoleCreate schema containing role details.
         :return: The created UserRole object if successful, else None.
         """
-        logger.debug(f"Service adding role '{role_create.role}' to user '{username}'")
-        user = self.user_repo.get_user_by_username(username)
+        logger.debug("Service adding role '%s' to user '%s'", role_create.role, username)
+        user = await self.user_repo.get_user_by_username(username)
         if not user:
-            logger.warning(f"User '{username}' not found while adding role.")
+            logger.warning("User '%s' not found while adding role.", username)
             return None
-        return self.user_repo.add_user_role(user, role_create)
+        return await self.user_repo.add_user_role(user, role_create)
+
+    async def bulk_assign_roles(
+        self, assignments: List[schemas.UserRoleAssignment], chunk_size: int = settings.BULK_CHUNK_SIZE
+    ) -> schemas.BulkRoleResponse:
+        """
+        Assigns roles in bulk, replacing the existing role of a user in a service.
+        Each chunk costs one query for the users, one for the services, one upsert and one commit.
+
+        :param assignments: The (username, service, role) assignments. The last one wins for repeated pairs.
+        :param chunk_size: Number of assignments written and committed together.
+        :return: Summary of the applied assignments and the unknown users and services.
+        """
+        logger.debug("Service assigning %s roles in bulk", len(assignments))
+        # Keep the last assignment per (user, service) pair, ON CONFLICT can't touch a row twice
+        unique = {(a.username, a.service_id): a for a in assignments}
+        return await self._bulk_roles(list(unique.values()), len(assignments), chunk_size, revoke=False)
+
+    async def bulk_revoke_roles(
+        self, refs: List[schemas.UserServiceRef], chunk_size: int = settings.BULK_CHUNK_SIZE
+    ) -> schemas.BulkRoleResponse:
+        """
+        Revokes the roles of users in services in bulk.
 
-    def get_user_by_username(self, username: str) -> Optional[models.User]:
+        :param refs: The (username, service) pairs to revoke.
+        :param chunk_size: Number of pairs deleted and committed together.
+        :return: Summary of the revoked roles and the unknown users and services.
         """
-        Retrieves a user by their username.
+        logger.debug("Service revoking %s roles in bulk", len(refs))
+        unique = {(ref.username, ref.service_id): ref for ref in refs}
+        return await self._bulk_roles(list(unique.values()), len(refs), chunk_size, revoke=True)
+
+    async def _bulk_roles(
+        self, items: List[Any], requested: int, chunk_size: int, revoke: bool
+    ) -> schemas.BulkRoleResponse:
+        applied = 0
+        unknown_users: set = set()
+        unknown_services: set = set()
+        for start in range(0, len(items), chunk_size):
+            chunk = items[start:start + chunk_size]
+            users = await self.user_repo.get_users_by_usernames(list({item.username for item in chunk}))
+            services = await self.user_repo.get_existing_service_ids(list({item.service_id for item in chunk}))
+            valid = []
+            for item in chunk:
+                if item.username not in users:
+                    unknown_users.add(item.username)
+                elif item.service_id not in services:
+                    unknown_services.add(str(item.service_id))
+                else:
+                    valid.append(item)
+            affected = {users[item.username][0]: (item.username, users[item.username][1]) for item in valid}
+            if revoke:
+                applied += await self.user_repo.delete_user_roles(
+                    [(users[item.username][0], item.service_id) for item in valid], affected
+                )
+            else:
+                applied += await self.user_repo.upsert_user_roles(
+                    [
+                        {"user_id": users[item.username][0], "service_id": item.service_id, "role": item.role}
+                        for item in valid
+                    ],
+                    affected,
+                )
+        return schemas.BulkRoleResponse(
+            requested=requested,
+            applied=applied,
+            unknown_users=sorted(unknown_users),
+            unknown_services=sorted(unknown_services),
+        )
+
+    async def get_user_snapshot_by_username(self, username: str) -> Optional[UserSnapshot]:
+        """
+        Retrieves a cached, detached snapshot of a user by their username.
 
         :param username: The username of the user to retrieve.
-        :return: User object if found, else None.
+        :return: UserSnapshot if found, else None.
+        """
+        logger.debug("Service fetching user snapshot by username: %s", username)
+        return await self.user_repo.get_user_snapshot_by_username(username)
+
+    async def get_user_snapshots_by_usernames(self, usernames: List[str]) -> Dict[str, UserSnapshot]:
         """
-        logger.debug(f"Service fetching user by username: {username}")
-        return self.user_repo.get_user_by_username(username)
+        Retrieves cached, detached snapshots of many users at once.
+
+        :param usernames: The usernames to look up.
+        :return: Mapping of username to UserSnapshot for the users that exist.
+        """
+        logger.debug("Service fetching %s user snapshots", len(usernames))
+        return await self.user_repo.get_user_snapshots_by_usernames(usernames)
+
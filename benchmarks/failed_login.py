@@ -0,0 +1,106 @@
+"""
+Compares the credential lookup of a failed login before and after the
+single-query lookup in UserRepository.authenticate_user.
+
+A failed login for an unknown name used to cost two full-entity queries
+(by username, then by email) before bcrypt even started, the new lookup
+costs one query selecting only the id and the password hash.
+
+Runs against DATABASE_URL, e.g. a local Postgres or a SQLite file:
+
+    DATABASE_URL=sqlite:///bench.db python -m benchmarks.failed_login --users 10000
+"""
+import argparse
+import statistics
+import time
+import uuid
+from typing import Callable, Dict, List
+
+from sqlalchemy import delete
+
+from app import models
+from app.api.deps import SessionLocal, engine
+from app.crud import UserRepository
+
+USER_PREFIX = "bench_login_"
+
+
+def seed_users(count: int) -> None:
+    rows = [
+        {
+            "id": uuid.uuid4(),
+            "username": f"{USER_PREFIX}{i}",
+            "email": f"{USER_PREFIX}{i}@example.com",
+            "hashed_password": "not-a-real-hash",
+        }
+        for i in range(count)
+    ]
+    with SessionLocal() as db:
+        for start in range(0, len(rows), 1000):
+            db.execute(models.User.__table__.insert(), rows[start:start + 1000])
+        db.commit()
+
+
+def cleanup_users() -> None:
+    with SessionLocal() as db:
+        db.execute(delete(models.User).where(models.User.username.startswith(USER_PREFIX)))
+        db.commit()
+
+
+def legacy_lookup(repo: UserRepository, login: str) -> None:
+    user = repo.db.query(models.User).filter(models.User.username == login).first()
+    if not user:
+        repo.db.query(models.User).filter(models.User.email == login).first()
+
+
+def single_query_lookup(repo: UserRepository, login: str) -> None:
+    repo._get_credentials(login)
+
+
+def measure(lookup: Callable[[UserRepository, str], None], logins: List[str]) -> Dict[str, float]:
+    timings = []
+    with SessionLocal() as db:
+        repo = UserRepository(db)
+        for login in logins:
+            started = time.perf_counter()
+            lookup(repo, login)
+            timings.append((time.perf_counter() - started) * 1000)
+            db.rollback()
+    timings.sort()
+    return {
+        "mean_ms": statistics.fmean(timings),
+        "p50_ms": timings[len(timings) // 2],
+        "p95_ms": timings[int(len(timings) * 0.95)],
+        "p99_ms": timings[int(len(timings) * 0.99)],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10000, help="number of seeded users")
+    parser.add_argument("--iterations", type=int, default=2000, help="failed logins per variant")
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine)
+    cleanup_users()
+    seed_users(args.users)
+    try:
+        # Unknown names miss both the username and the email, the most common attacker path
+        logins = [f"unknown_{i}@example.com" for i in range(args.iterations)]
+        measure(single_query_lookup, logins[:100])  # warm up the pool and the caches
+        results = {
+            "two_queries": measure(legacy_lookup, logins),
+            "single_query": measure(single_query_lookup, logins),
+        }
+    finally:
+        cleanup_users()
+
+    print(f"Failed-login credential lookup, {args.users} users, {args.iterations} attempts ({engine.dialect.name})")
+    for name, stats in results.items():
+        print(f"  {name:<13} " + "  ".join(f"{key}={value:.3f}" for key, value in stats.items()))
+    gain = 1 - results["single_query"]["mean_ms"] / results["two_queries"]["mean_ms"]
+    print(f"  mean latency reduced by {gain:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Per-hash latency of candidate password hashing configurations on this machine.
+
+Each candidate is a scheme with its cost parameters, e.g. bcrypt:rounds=12 or
+argon2:time_cost=3,memory_cost=65536,parallelism=4. Without --candidate a
+default set is measured, along with the configuration from the settings.
+argon2 candidates need the argon2 extra (argon2-cffi) and are skipped without it.
+
+    python -m benchmarks.hashing --iterations 20
+    python -m benchmarks.hashing --candidate bcrypt:rounds=11 --candidate argon2:memory_cost=19456,time_cost=2,parallelism=1
+"""
+import argparse
+import statistics
+import time
+from typing import Dict, List, Tuple
+
+from passlib.exc import MissingBackendError
+
+from app.core.hashing import build_crypt_context
+from app.core.settings import settings
+
+DEFAULT_CANDIDATES = [
+    "bcrypt:rounds=10",
+    "bcrypt:rounds=11",
+    "bcrypt:rounds=12",
+    "bcrypt:rounds=13",
+    "argon2:time_cost=2,memory_cost=19456,parallelism=1",
+    "argon2:time_cost=3,memory_cost=65536,parallelism=4",
+]
+
+PARAMETERS = {
+    "bcrypt": {"rounds": settings.BCRYPT_ROUNDS},
+    "argon2": {
+        "time_cost": settings.ARGON2_TIME_COST,
+        "memory_cost": settings.ARGON2_MEMORY_COST,
+        "parallelism": settings.ARGON2_PARALLELISM,
+    },
+}
+
+
+def parse_candidate(candidate: str) -> Tuple[str, Dict[str, int]]:
+    scheme, _, options = candidate.partition(":")
+    if scheme not in PARAMETERS:
+        raise ValueError(f"Unsupported scheme: {scheme}")
+    params = dict(PARAMETERS[scheme])
+    for option in filter(None, options.split(",")):
+        name, _, value = option.partition("=")
+        if name not in params:
+            raise ValueError(f"Unknown {scheme} parameter: {name}")
+        params[name] = int(value)
+    return scheme, params
+
+
+def current_candidate() -> str:
+    scheme = settings.PASSWORD_HASH_SCHEMES[0]
+    return f"{scheme}:" + ",".join(f"{name}={value}" for name, value in PARAMETERS[scheme].items())
+
+
+def measure(scheme: str, params: Dict[str, int], iterations: int) -> Dict[str, float]:
+    context = build_crypt_context(
+        schemes=[scheme],
+        bcrypt_rounds=params.get("rounds", settings.BCRYPT_ROUNDS),
+        argon2_time_cost=params.get("time_cost", settings.ARGON2_TIME_COST),
+        argon2_memory_cost=params.get("memory_cost", settings.ARGON2_MEMORY_COST),
+        argon2_parallelism=params.get("parallelism", settings.ARGON2_PARALLELISM),
+    )
+    hashed = context.hash("warm-up")  # loads the backend
+    hash_timings: List[float] = []
+    verify_timings: List[float] = []
+    for i in range(iterations):
+        password = f"benchmark-password-{i}"
+        started = time.perf_counter()
+        hashed = context.hash(password)
+        hash_timings.append((time.perf_counter() - started) * 1000)
+        started = time.perf_counter()
+        context.verify(password, hashed)
+        verify_timings.append((time.perf_counter() - started) * 1000)
+    return {
+        "hash_p50_ms": statistics.median(hash_timings),
+        "hash_max_ms": max(hash_timings),
+        "verify_p50_ms": statistics.median(verify_timings),
+        "verifies_per_core_s": 1000 / statistics.median(verify_timings),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candidate", action="append", help="scheme:param=value,... (repeatable)")
+    parser.add_argument("--iterations", type=int, default=10, help="hashes and verifications per candidate")
+    args = parser.parse_args()
+
+    current = current_candidate()
+    candidates = args.candidate or [current] + [c for c in DEFAULT_CANDIDATES if c != current]
+    print(f"Password hashing latency, {args.iterations} iterations per candidate (current: {current})")
+    for candidate in candidates:
+        scheme, params = parse_candidate(candidate)
+        try:
+            stats = measure(scheme, params, args.iterations)
+        except MissingBackendError:
+            print(f"  {candidate:<55} skipped, no {scheme} backend installed")
+            continue
+        marker = "*" if candidate == current else " "
+        print(f"{marker} {candidate:<55} " + "  ".join(f"{key}={value:.1f}" for key, value in stats.items()))
+
+
+if __name__ == "__main__":
+    main()
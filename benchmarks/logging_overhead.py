@@ -0,0 +1,112 @@
+"""
+Per-request logging overhead before and after the queue-based pipeline.
+
+Replays the log calls of a login request (3 INFO lines and 4 DEBUG lines,
+DEBUG being disabled) against two setups writing to a rotating file and a
+console stream:
+
+  direct  the handlers are attached to the logger and the messages are f-strings,
+          as before: the request thread formats every message and does the I/O
+  queued  a QueueHandler feeds a QueueListener thread and the messages use lazy
+          %-formatting, as setup_logging does now
+
+Only the time spent in the request thread is counted, the listener drains the
+queue in the background (its drain time is reported separately).
+
+    python -m benchmarks.logging_overhead --requests 20000
+"""
+import argparse
+import logging
+import os
+import queue
+import tempfile
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Callable, Dict, List
+
+FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+
+def make_handlers(log_dir: str, name: str) -> List[logging.Handler]:
+    formatter = logging.Formatter(FORMAT)
+    file_handler = RotatingFileHandler(os.path.join(log_dir, f"{name}.log"), maxBytes=10**6, backupCount=3)
+    console_handler = logging.StreamHandler(open(os.devnull, "w"))
+    for handler in (file_handler, console_handler):
+        handler.setFormatter(formatter)
+    return [file_handler, console_handler]
+
+
+def fstring_request(logger: logging.Logger, username: str, i: int) -> None:
+    logger.info(f"User login attempt: {username}")
+    logger.debug(f"Service authentication for user: {username}")
+    logger.debug(f"Authenticating user: {username}")
+    logger.info(f"User '{username}' successfully authenticated.")
+    logger.debug(f"Password verify took {i * 0.001:.1f} ms, {i % 8} jobs pending.")
+    logger.debug(f"Created JWT token for data: {{'sub': '{username}', 'n': {i}}}")
+    logger.info(f"User {username} has been successfully authenticated.")
+
+
+def lazy_request(logger: logging.Logger, username: str, i: int) -> None:
+    logger.info("User login attempt: %s", username)
+    logger.debug("Service authentication for user: %s", username)
+    logger.debug("Authenticating user: %s", username)
+    logger.info("User '%s' successfully authenticated.", username)
+    logger.debug("Password verify took %.1f ms, %s jobs pending.", i * 0.001, i % 8)
+    logger.debug("Created JWT token for data: %s", {"sub": username, "n": i})
+    logger.info("User %s has been successfully authenticated.", username)
+
+
+def measure(
+    log_request: Callable[[logging.Logger, str, int], None], logger: logging.Logger, requests: int
+) -> List[float]:
+    timings = []
+    for i in range(requests):
+        started = time.perf_counter()
+        log_request(logger, f"user_{i % 1000}", i)
+        timings.append((time.perf_counter() - started) * 1e6)
+    return sorted(timings)
+
+
+def summarize(timings: List[float]) -> Dict[str, float]:
+    return {
+        "mean_us": sum(timings) / len(timings),
+        "p50_us": timings[len(timings) // 2],
+        "p99_us": timings[int(len(timings) * 0.99)],
+        "max_us": timings[-1],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000, help="simulated requests per setup")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as log_dir:
+        direct = logging.getLogger("bench.direct")
+        direct.propagate = False
+        direct.setLevel(logging.INFO)
+        for handler in make_handlers(log_dir, "direct"):
+            direct.addHandler(handler)
+        before = summarize(measure(fstring_request, direct, args.requests))
+
+        queued = logging.getLogger("bench.queued")
+        queued.propagate = False
+        queued.setLevel(logging.INFO)
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        queued.addHandler(QueueHandler(log_queue))
+        listener = QueueListener(log_queue, *make_handlers(log_dir, "queued"), respect_handler_level=True)
+        listener.start()
+        after = summarize(measure(lazy_request, queued, args.requests))
+        started = time.perf_counter()
+        listener.stop()
+        drain = time.perf_counter() - started
+
+    print(f"Logging overhead per login request (3 INFO + 4 disabled DEBUG), {args.requests} requests")
+    for name, stats in (("direct", before), ("queued", after)):
+        print(f"  {name:<7} " + "  ".join(f"{key}={value:.1f}" for key, value in stats.items()))
+    print(f"  mean overhead reduced by {1 - after['mean_us'] / before['mean_us']:.0%}")
+    print(f"  listener drained the remaining queue in {drain * 1000:.0f} ms after the run")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Load test: latency of an admin endpoint while /api/v1/token is under a login spike.
+
+Before the spike the admin endpoint is sampled alone (baseline), then again
+while many concurrent clients keep logging in. With the connection released
+before password verification, logins no longer hold pool slots for the whole
+bcrypt run and the admin latency stays close to the baseline.
+
+Runs against a running instance:
+
+    python -m benchmarks.login_spike --base-url http://localhost:8000 \\
+        --admin-username admin --admin-password secret --login-concurrency 64
+
+The spike comes from a single client IP and fails logins for a single user,
+which the login limiters would answer with 429 before any password is
+verified. Start the instance with the limiters disabled:
+
+    LOGIN_USERNAME_PER_MINUTE=0 LOGIN_IP_PER_MINUTE=0 uvicorn app.main:app
+
+The run fails when the spike gets 429 responses.
+"""
+import argparse
+import asyncio
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+
+
+def summarize(timings: List[float], errors: int) -> Dict[str, float]:
+    timings = sorted(timings)
+    if not timings:
+        return {"requests": 0, "errors": errors}
+    return {
+        "requests": len(timings),
+        "errors": errors,
+        "p50_ms": timings[len(timings) // 2],
+        "p95_ms": timings[int(len(timings) * 0.95)],
+        "p99_ms": timings[int(len(timings) * 0.99)],
+        "max_ms": timings[-1],
+    }
+
+
+async def sample_admin(client: httpx.AsyncClient, token: str, duration: float) -> Dict[str, float]:
+    timings: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        response = await client.get(
+            "/api/v1/users/", params={"limit": 10}, headers={"Authorization": f"Bearer {token}"}
+        )
+        if response.status_code == 200:
+            timings.append((time.perf_counter() - started) * 1000)
+        else:
+            errors += 1
+        await asyncio.sleep(0.05)
+    return summarize(timings, errors)
+
+
+async def login_loop(
+    client: httpx.AsyncClient, username: str, password: str, stop: asyncio.Event, counts: Dict[int, int]
+) -> None:
+    while not stop.is_set():
+        response = await client.post("/api/v1/token", data={"username": username, "password": password})
+        counts[response.status_code] = counts.get(response.status_code, 0) + 1
+
+
+async def run(args: argparse.Namespace) -> None:
+    limits = httpx.Limits(max_connections=args.login_concurrency + 8)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60, limits=limits) as client:
+        response = await client.post(
+            "/api/v1/token", data={"username": args.admin_username, "password": args.admin_password}
+        )
+        response.raise_for_status()
+        token = response.json()["access_token"]
+
+        baseline = await sample_admin(client, token, args.duration)
+
+        stop = asyncio.Event()
+        counts: Dict[int, int] = {}
+        logins = [
+            asyncio.create_task(
+                login_loop(client, args.login_username or args.admin_username, args.login_password, stop, counts)
+            )
+            for _ in range(args.login_concurrency)
+        ]
+        await asyncio.sleep(1)  # let the spike build up
+        during_spike = await sample_admin(client, token, args.duration)
+        stop.set()
+        await asyncio.gather(*logins)
+
+    print(f"Admin endpoint GET /api/v1/users/ with {args.login_concurrency} concurrent logins")
+    for name, stats in (("baseline", baseline), ("login spike", during_spike)):
+        print(f"  {name:<12} " + "  ".join(f"{key}={value:.1f}" for key, value in stats.items()))
+    print(f"  login responses by status: {dict(sorted(counts.items()))}")
+    if counts.get(429):
+        sys.exit(
+            "The login spike was rate limited (429), so it barely verified any password. "
+            "Start the instance with LOGIN_USERNAME_PER_MINUTE=0 LOGIN_IP_PER_MINUTE=0."
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--admin-username", required=True)
+    parser.add_argument("--admin-password", required=True)
+    parser.add_argument("--login-username", help="username used by the spike, the admin username by default")
+    parser.add_argument(
+        "--login-password", default="wrong-password",
+        help="password used by the spike, a wrong one still costs a full bcrypt verification"
+    )
+    parser.add_argument("--login-concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds sampled per phase")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Cold start of a worker: time to import app.main and to run the lifespan
+warm-up until the app reports ready.
+
+Every run is a fresh interpreter, like a new replica. The default run skips
+the schema creation, as the startup command runs `alembic upgrade head`;
+--create-all also measures the create_all that used to run on every import.
+
+Runs against DATABASE_URL, e.g. a local Postgres or a SQLite file:
+
+    DATABASE_URL=sqlite:///bench.db python -m benchmarks.startup --runs 10 --create-all
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+CHILD = """
+import asyncio, json
+from app.main import app
+from app.core.startup import startup_state
+
+async def start():
+    async with app.router.lifespan_context(app):
+        print("STARTUP", json.dumps(startup_state.stats()), flush=True)
+
+asyncio.run(start())
+"""
+
+
+def run_once(create_all: bool) -> Dict[str, float]:
+    env = {**os.environ, "DB_CREATE_ALL": "true" if create_all else "false"}
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD], env=env, check=True, capture_output=True, text=True
+    ).stdout
+    total_ms = (time.perf_counter() - started) * 1000
+    line = next(line for line in output.splitlines() if line.startswith("STARTUP "))
+    stats = json.loads(line[len("STARTUP "):])
+    return {"import_ms": stats["import_ms"], "startup_ms": stats["startup_ms"], "process_ms": total_ms,
+            **{f"{name}_ms": ms for name, ms in stats["steps_ms"].items()}}
+
+
+def summarize(runs: List[Dict[str, float]]) -> Dict[str, float]:
+    return {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10, help="cold starts per variant")
+    parser.add_argument("--create-all", action="store_true", help="also measure a startup with DB_CREATE_ALL")
+    args = parser.parse_args()
+
+    variants = {"lifespan": False}
+    if args.create_all:
+        variants["create_all"] = True
+    run_once(True)  # create the schema and warm up the bytecode cache
+    print(f"Cold start, median of {args.runs} runs")
+    for name, create_all in variants.items():
+        stats = summarize([run_once(create_all) for _ in range(args.runs)])
+        print(f"  {name:<10} " + "  ".join(f"{key}={value:.1f}" for key, value in stats.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+Benchmark suite for the auth hot paths: login, token-authenticated reads and pagination.
+
+Seeds users, services and roles at the given scale into DATABASE_URL (a local
+Postgres or a SQLite file), then measures throughput and p50/p95/p99 latency
+of each scenario at several concurrency levels. The app runs in-process
+through httpx's ASGI transport unless --base-url points to a running
+instance on the same database. Results are saved as JSON so that two
+commits can be diffed:
+
+    DATABASE_URL=sqlite:///bench.db python -m benchmarks.suite --users 10000 \\
+        --concurrency 1,8,32 --output bench-$(git rev-parse --short HEAD).json
+
+Scenarios:
+  login     POST /api/v1/token with the password of a random seeded user
+  auth_read GET /api/v1/users/?limit=1, round robin over the tokens of the seeded admins
+  paginate  GET /api/v1/users/?limit=<page size>, following next_cursor through the users
+
+Login throttling is disabled for the in-process app, the suite measures the
+login path itself. A running instance given with --base-url must be started
+with it disabled too (LOGIN_USERNAME_PER_MINUTE=0 LOGIN_IP_PER_MINUTE=0):
+all the requests come from one client IP, which the login limiter lets
+through 20 at once then 1 per second, so the login numbers would mostly
+measure 429 responses.
+
+A level whose requests all failed, or more than --max-error-rate of them,
+is flagged as invalid in the results and the suite exits with an error
+once they are saved. The seeded rows share the bench_ prefix and are
+removed afterwards unless --keep is given.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# Must be set before the app settings are loaded
+os.environ.setdefault("LOGIN_USERNAME_PER_MINUTE", "0")
+os.environ.setdefault("LOGIN_IP_PER_MINUTE", "0")
+
+import httpx  # noqa: E402
+from sqlalchemy import delete, select  # noqa: E402
+
+from app import models  # noqa: E402
+from app.api.deps import SessionLocal, engine  # noqa: E402
+from app.core.hashing import pwd_context  # noqa: E402
+
+PREFIX = "bench_"
+PASSWORD = "bench-password"
+ROLES = ("viewer", "editor", "owner")
+
+Request = Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]
+
+
+def seed(users: int, services: int, roles_per_user: int, admins: int, rng: random.Random) -> None:
+    # A single hash for everyone keeps seeding fast, logins still pay a full verification
+    hashed_password = pwd_context.hash(PASSWORD)
+    service_ids = [uuid.uuid4() for _ in range(services)]
+    user_ids = [uuid.uuid4() for _ in range(users)]
+    with SessionLocal() as db:
+        db.execute(models.Service.__table__.insert(), [
+            {"id": service_id, "name": f"{PREFIX}service_{i}"} for i, service_id in enumerate(service_ids)
+        ])
+        for start in range(0, users, 1000):
+            db.execute(models.User.__table__.insert(), [
+                {
+                    "id": user_ids[i],
+                    "username": f"{PREFIX}user_{i:07d}",
+                    "email": f"{PREFIX}user_{i:07d}@example.com",
+                    "hashed_password": hashed_password,
+                }
+                for i in range(start, min(start + 1000, users))
+            ])
+            roles = []
+            for i in range(start, min(start + 1000, users)):
+                for j, service_id in enumerate(rng.sample(service_ids, min(roles_per_user, services))):
+                    role = "admin" if i < admins and j == 0 else rng.choice(ROLES)
+                    roles.append({"id": uuid.uuid4(), "user_id": user_ids[i], "service_id": service_id, "role": role})
+            if roles:
+                db.execute(models.UserRole.__table__.insert(), roles)
+        db.commit()
+
+
+def cleanup() -> None:
+    with SessionLocal() as db:
+        user_ids = select(models.User.id).where(models.User.username.startswith(PREFIX))
+        service_ids = select(models.Service.id).where(models.Service.name.startswith(PREFIX))
+        db.execute(delete(models.RefreshToken).where(models.RefreshToken.user_id.in_(user_ids)))
+        db.execute(delete(models.UserRole).where(
+            models.UserRole.user_id.in_(user_ids) | models.UserRole.service_id.in_(service_ids)
+        ))
+        db.execute(delete(models.User).where(models.User.username.startswith(PREFIX)))
+        db.execute(delete(models.Service).where(models.Service.name.startswith(PREFIX)))
+        db.commit()
+
+
+def summarize(timings: List[float], statuses: Dict[int, int], elapsed: float) -> Dict[str, Any]:
+    timings = sorted(timings)
+    requests = sum(statuses.values())
+    result: Dict[str, Any] = {
+        "requests": requests,
+        "ok": len(timings),
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+        "throughput_rps": len(timings) / elapsed if elapsed else 0.0,
+        "error_rate": (requests - len(timings)) / requests if requests else 1.0,
+    }
+    if timings:
+        result.update({
+            "p50_ms": timings[len(timings) // 2],
+            "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+            "p99_ms": timings[min(len(timings) - 1, int(len(timings) * 0.99))],
+            "max_ms": timings[-1],
+        })
+    return result
+
+
+async def run_level(client: httpx.AsyncClient, request: Request, concurrency: int, duration: float) -> Dict[str, Any]:
+    timings: List[float] = []
+    statuses: Dict[int, int] = {}
+    deadline = time.perf_counter() + duration
+
+    async def worker(worker_id: int) -> None:
+        iteration = 0
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = await request(client, worker_id * 1_000_000 + iteration)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if response.status_code == 200:
+                timings.append(elapsed_ms)
+            iteration += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return summarize(timings, statuses, time.perf_counter() - started)
+
+
+async def login(client: httpx.AsyncClient, username: str) -> httpx.Response:
+    return await client.post("/api/v1/token", data={"username": username, "password": PASSWORD})
+
+
+def build_scenarios(users: int, tokens: List[str], page_size: int, rng: random.Random) -> Dict[str, Request]:
+    cursors: Dict[int, Optional[str]] = {}
+
+    async def login_scenario(client: httpx.AsyncClient, n: int) -> httpx.Response:
+        return await login(client, f"{PREFIX}user_{rng.randrange(users):07d}")
+
+    async def auth_read_scenario(client: httpx.AsyncClient, n: int) -> httpx.Response:
+        headers = {"Authorization": f"Bearer {tokens[n % len(tokens)]}"}
+        return await client.get("/api/v1/users/", params={"limit": 1}, headers=headers)
+
+    async def paginate_scenario(client: httpx.AsyncClient, n: int) -> httpx.Response:
+        worker_id = n // 1_000_000
+        params: Dict[str, Any] = {"limit": page_size}
+        if cursors.get(worker_id):
+            params["cursor"] = cursors[worker_id]
+        headers = {"Authorization": f"Bearer {tokens[worker_id % len(tokens)]}"}
+        response = await client.get("/api/v1/users/", params=params, headers=headers)
+        if response.status_code == 200:
+            cursors[worker_id] = response.json().get("next_cursor")
+        return response
+
+    return {"login": login_scenario, "auth_read": auth_read_scenario, "paginate": paginate_scenario}
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def is_valid(stats: Dict[str, Any], max_error_rate: float) -> bool:
+    """
+    Tells whether a level measured the scenario rather than its failures.
+    """
+    return stats["ok"] > 0 and stats["error_rate"] <= max_error_rate
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    if args.base_url:
+        transport = None
+        base_url = args.base_url
+    else:
+        from app.main import app
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://bench"
+
+    levels = [int(level) for level in args.concurrency.split(",")]
+    limits = httpx.Limits(max_connections=max(levels) + 8)
+    results: Dict[str, Dict[str, Any]] = {}
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=60, limits=limits) as client:
+        tokens = []
+        for i in range(args.admins):
+            response = await login(client, f"{PREFIX}user_{i:07d}")
+            response.raise_for_status()
+            tokens.append(response.json()["access_token"])
+
+        scenarios = build_scenarios(args.users, tokens, args.page_size, rng)
+        for name in args.scenarios.split(","):
+            results[name] = {}
+            for level in levels:
+                await run_level(client, scenarios[name], level, min(1.0, args.duration))  # warm-up
+                stats = await run_level(client, scenarios[name], level, args.duration)
+                stats["valid"] = is_valid(stats, args.max_error_rate)
+                results[name][str(level)] = stats
+                print(
+                    f"  {name:<10} c={level:<4} " + "  ".join(
+                        f"{key}={value:.1f}" for key, value in stats.items() if isinstance(value, float)
+                    ) + f"  statuses={stats['statuses']}" + ("" if stats["valid"] else "  INVALID")
+                )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10000, help="number of seeded users")
+    parser.add_argument("--services", type=int, default=20, help="number of seeded services")
+    parser.add_argument("--roles-per-user", type=int, default=2, help="roles of each user in distinct services")
+    parser.add_argument("--admins", type=int, default=50, help="seeded users with an admin role, used for reads")
+    parser.add_argument("--scenarios", default="login,auth_read,paginate", help="comma separated scenarios")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds measured per scenario and level")
+    parser.add_argument("--page-size", type=int, default=100, help="page size of the paginate scenario")
+    parser.add_argument("--seed", type=int, default=42, help="random seed of the data and the requests")
+    parser.add_argument(
+        "--max-error-rate", type=float, default=0.01,
+        help="share of non-200 responses above which a level is invalid"
+    )
+    parser.add_argument("--base-url", help="benchmark a running instance instead of the in-process app")
+    parser.add_argument("--output", help="path of the JSON results")
+    parser.add_argument("--keep", action="store_true", help="keep the seeded data")
+    args = parser.parse_args()
+    if not 0 < args.admins <= args.users or args.services < 1:
+        parser.error("--admins must be between 1 and --users, and --services at least 1")
+
+    models.Base.metadata.create_all(bind=engine)
+    cleanup()
+    started = time.perf_counter()
+    seed(args.users, args.services, args.roles_per_user, args.admins, random.Random(args.seed))
+    print(
+        f"Seeded {args.users} users, {args.services} services in {time.perf_counter() - started:.1f}s "
+        f"({engine.dialect.name}), {args.duration}s per scenario and level"
+    )
+    try:
+        results = asyncio.run(run(args))
+    finally:
+        if not args.keep:
+            cleanup()
+
+    if args.output:
+        report = {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "database": engine.dialect.name,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "parameters": {
+                key: value for key, value in vars(args).items() if key not in ("output", "keep")
+            },
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"Results saved to {args.output}")
+
+    invalid = [
+        f"{name} c={level} ({stats['ok']} ok of {stats['requests']}, statuses {stats['statuses']})"
+        for name, levels in results.items()
+        for level, stats in levels.items()
+        if not stats["valid"]
+    ]
+    if invalid:
+        sys.exit(
+            "Invalid results, the failures dominate: " + "; ".join(invalid)
+            + ". With --base-url, check that the instance runs without login throttling."
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Latency of the user search: first pages of prefix and substring searches on
+username and email, with a seeded user table.
+
+On Postgres, after `alembic upgrade head`, a prefix search is a range scan
+of the lower(...) COLLATE "C" index that stops after one page, and a
+substring search is a bitmap scan of the trigram index. --explain prints
+the query plans and fails when a search can't use its index.
+
+A substring search reads at most USER_SEARCH_MAX_CANDIDATES + 1 matches
+before sorting them, the email_contains_broad variant looks for a substring
+of every email ("exa") and measures how fast such a search is refused.
+
+Runs against DATABASE_URL, e.g. a local Postgres or a SQLite file:
+
+    DATABASE_URL=postgresql://... python -m benchmarks.user_search --users 1000000 --explain
+"""
+import argparse
+import random
+import statistics
+import string
+import sys
+import time
+import uuid
+from typing import Dict, List, Tuple
+
+from sqlalchemy import delete, text
+
+from app import models
+from app.api.deps import SessionLocal, engine
+from app.core.settings import settings
+from app.crud import SearchTooBroadError, UserRepository
+
+USER_PREFIX = "bench_search_"
+
+
+def seed_users(count: int) -> None:
+    rng = random.Random(42)
+    with SessionLocal() as db:
+        for start in range(0, count, 10000):
+            rows = []
+            for i in range(start, min(start + 10000, count)):
+                word = "".join(rng.choices(string.ascii_lowercase, k=8))
+                rows.append({
+                    "id": uuid.uuid4(),
+                    "username": f"{USER_PREFIX}{word}{i}",
+                    "email": f"{word}{i}@example.com",
+                    "hashed_password": "not-a-real-hash",
+                })
+            db.execute(models.User.__table__.insert(), rows)
+        db.commit()
+        if engine.dialect.name == "postgresql":
+            db.execute(text("ANALYZE users"))
+            db.commit()
+
+
+def cleanup_users() -> None:
+    with SessionLocal() as db:
+        db.execute(delete(models.User).where(models.User.username.startswith(USER_PREFIX)))
+        db.commit()
+
+
+def measure(searches: List[Tuple[str, str, str]], limit: int) -> Dict[str, float]:
+    timings = []
+    refused = 0
+    with SessionLocal() as db:
+        repo = UserRepository(db)
+        for field, term, mode in searches:
+            started = time.perf_counter()
+            try:
+                repo._search_users(field, term, mode, limit, None)
+            except SearchTooBroadError:
+                refused += 1
+            timings.append((time.perf_counter() - started) * 1000)
+            db.rollback()
+    timings.sort()
+    return {
+        "mean_ms": statistics.fmean(timings),
+        "p50_ms": timings[len(timings) // 2],
+        "p95_ms": timings[int(len(timings) * 0.95)],
+        "max_ms": timings[-1],
+        "refused": refused,
+    }
+
+
+def explain(field: str, term: str, mode: str, limit: int) -> bool:
+    """
+    Prints the plan of a search and tells whether it uses the search index of its mode.
+    Sequential scans are disabled so that the check holds on a small table too:
+    the index is only left out then when the planner can't use it at all.
+    """
+    index = f"ix_users_{field}_search" if mode == "prefix" else f"ix_users_{field}_trgm"
+    with SessionLocal() as db:
+        repo = UserRepository(db)
+        if mode == "prefix":
+            query = repo._search_query(field, term, mode, limit, None)
+        else:
+            query = repo._search_candidates_query(field, term, None, settings.USER_SEARCH_MAX_CANDIDATES + 1)
+        compiled = query.statement.compile(dialect=engine.dialect)
+        connection = db.connection()
+        connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        plan = [row[0] for row in connection.exec_driver_sql(f"EXPLAIN ANALYZE {compiled}", compiled.params)]
+        db.rollback()
+    uses_index = any(index in line for line in plan)
+    print(f"  {field} {mode} '{term}': {'uses' if uses_index else 'DOES NOT USE'} {index}")
+    for line in plan:
+        print(f"    {line}")
+    return uses_index
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100000, help="number of seeded users")
+    parser.add_argument("--searches", type=int, default=200, help="searches per variant")
+    parser.add_argument("--limit", type=int, default=20, help="page size")
+    parser.add_argument("--explain", action="store_true", help="print the Postgres query plans")
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine)
+    cleanup_users()
+    seed_users(args.users)
+    rng = random.Random(7)
+    try:
+        words = ["".join(rng.choices(string.ascii_lowercase, k=3)) for _ in range(args.searches)]
+        variants = {
+            "username_prefix": [("username", USER_PREFIX + word, "prefix") for word in words],
+            "email_prefix": [("email", word, "prefix") for word in words],
+            "username_contains": [("username", word, "contains") for word in words],
+            "email_contains": [("email", word, "contains") for word in words],
+            "email_contains_broad": [("email", "exa", "contains") for _ in words],
+        }
+        measure(variants["username_prefix"][:20], args.limit)  # warm up the pool and the caches
+        results = {name: measure(searches, args.limit) for name, searches in variants.items()}
+        plans_ok = True
+        if args.explain and engine.dialect.name == "postgresql":
+            print("Query plans")
+            plans_ok = all([
+                explain(field, USER_PREFIX + words[0] if (field, mode) == ("username", "prefix") else words[0], mode,
+                        args.limit)
+                for field in ("username", "email")
+                for mode in ("prefix", "contains")
+            ])
+    finally:
+        cleanup_users()
+
+    print(f"User search, {args.users} users, {args.searches} searches per variant ({engine.dialect.name})")
+    for name, stats in results.items():
+        print(f"  {name:<20} " + "  ".join(
+            f"{key}={value:.3f}" if isinstance(value, float) else f"{key}={value}" for key, value in stats.items()
+        ))
+    if not plans_ok:
+        sys.exit("A search does not use its index, check the migrations and the search query.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import os
+import tempfile
+from types import SimpleNamespace
+
+# The settings are read when the application is imported, the tests run on a SQLite file
+os.environ.setdefault("POSTGRES_USER", "test")
+os.environ.setdefault("POSTGRES_PASSWORD", "test")
+os.environ.setdefault("POSTGRES_DB", "test")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='auth_service_tests_')}/test.db")
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.api.deps import SessionLocal, engine  # noqa: E402
+from app.core.security import get_current_admin_user  # noqa: E402
+from app.crud.role_index import role_index  # noqa: E402
+from app.crud.user_cache import user_cache  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Base  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    """
+    A session on freshly created tables, dropped with the in-memory state after the test.
+    """
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+        user_cache.clear()
+        role_index.replace([])
+
+
+@pytest.fixture
+def admin_client(db):
+    """
+    A client whose requests are made by an administrator.
+    """
+    app.dependency_overrides[get_current_admin_user] = lambda: SimpleNamespace(username="admin")
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
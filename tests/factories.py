@@ -0,0 +1,23 @@
+from app import models
+from app.core.hashing import pwd_context
+
+
+def add_service(db, name):
+    service = models.Service(name=name)
+    db.add(service)
+    db.commit()
+    return service
+
+
+def add_user(db, username, roles=(), password=None):
+    """
+    Adds a user with (service, role) pairs, who can only log in when given a password.
+    """
+    hashed_password = pwd_context.hash(password) if password else "not-a-hash"
+    user = models.User(username=username, email=f"{username.lower()}@example.com", hashed_password=hashed_password)
+    db.add(user)
+    db.flush()
+    for service, role in roles:
+        db.add(models.UserRole(user_id=user.id, service_id=service.id, role=role))
+    db.commit()
+    return user
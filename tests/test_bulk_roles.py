@@ -0,0 +1,60 @@
+import uuid
+
+from sqlalchemy import select
+
+from app import models
+from tests.factories import add_service, add_user
+
+
+def roles_in_db(db):
+    db.expire_all()
+    rows = db.execute(
+        select(models.User.username, models.Service.name, models.UserRole.role)
+        .join(models.UserRole.user)
+        .join(models.UserRole.service)
+    )
+    return sorted(tuple(row) for row in rows)
+
+
+def test_bulk_assign_upserts_roles(db, admin_client):
+    core = add_service(db, "core")
+    add_user(db, "alice", [(core, "reader")])
+    add_user(db, "bob")
+    unknown_service = uuid.uuid4()
+
+    response = admin_client.post("/api/v1/users/roles/bulk", json=[
+        {"username": "alice", "service_id": str(core.id), "role": "admin"},
+        {"username": "bob", "service_id": str(core.id), "role": "reader"},
+        {"username": "ghost", "service_id": str(core.id), "role": "reader"},
+        {"username": "alice", "service_id": str(unknown_service), "role": "reader"},
+    ])
+
+    assert response.status_code == 200, response.text
+    assert response.json() == {
+        "requested": 4,
+        "applied": 2,
+        "unknown_users": ["ghost"],
+        "unknown_services": [str(unknown_service)],
+    }
+    assert roles_in_db(db) == [("alice", "core", "admin"), ("bob", "core", "reader")]
+
+
+def test_bulk_revoke_deletes_only_the_given_pairs(db, admin_client):
+    core = add_service(db, "core")
+    billing = add_service(db, "billing")
+    add_user(db, "alice", [(core, "admin"), (billing, "reader")])
+    add_user(db, "bob", [(core, "reader"), (billing, "admin")])
+
+    response = admin_client.post("/api/v1/users/roles/bulk/revoke", json=[
+        {"username": "alice", "service_id": str(core.id)},
+        {"username": "bob", "service_id": str(billing.id)},
+    ])
+
+    assert response.status_code == 200, response.text
+    assert response.json()["applied"] == 2
+    assert roles_in_db(db) == [("alice", "billing", "reader"), ("bob", "core", "reader")]
+
+
+def test_bulk_revoke_rejects_integer_service_id(admin_client):
+    response = admin_client.post("/api/v1/users/roles/bulk/revoke", json=[{"username": "alice", "service_id": 1}])
+    assert response.status_code == 422
@@ -0,0 +1,42 @@
+import os
+import time
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+
+from app.core.keys import KeyRing
+
+
+def write_key(keys_dir, kid: str, age: float) -> None:
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    pem = private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+    path = os.path.join(keys_dir, f"{kid}.pem")
+    with open(path, "wb") as f:
+        f.write(pem)
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+
+
+def test_new_key_is_published_before_it_signs(tmp_path):
+    write_key(tmp_path, "old", age=3600)
+    ring = KeyRing("ES256", str(tmp_path), None, retention_seconds=3600, activation_delay=300)
+    ring.reload()
+    assert ring.signing_key().kid == "old"
+
+    write_key(tmp_path, "new", age=10)
+    ring.reload()
+    assert ring.signing_key().kid == "old"
+    assert b'"kid":"new"' in ring.jwks_json
+
+    os.utime(os.path.join(tmp_path, "new.pem"), (time.time() - 301, time.time() - 301))
+    ring.reload()
+    assert ring.signing_key().kid == "new"
+
+
+def test_first_key_signs_at_once(tmp_path):
+    write_key(tmp_path, "first", age=0)
+    ring = KeyRing("ES256", str(tmp_path), None, retention_seconds=3600, activation_delay=300)
+    ring.reload()
+    assert ring.signing_key().kid == "first"
@@ -0,0 +1,30 @@
+import io
+import json
+import logging
+import queue
+from logging.handlers import QueueListener
+
+from app.core.logging_config import JsonFormatter, LocalQueueHandler
+
+
+def test_json_log_keeps_the_exception_through_the_queue():
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JsonFormatter())
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, handler)
+    logger = logging.getLogger("auth_service.tests.logging")
+    logger.addHandler(LocalQueueHandler(log_queue))
+    listener.start()
+    try:
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logger.exception("Failed for %s", "alice")
+    finally:
+        listener.stop()
+        logger.handlers.clear()
+
+    entry = json.loads(stream.getvalue())
+    assert entry["message"] == "Failed for alice"
+    assert "ValueError: boom" in entry["exception"]
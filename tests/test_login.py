@@ -0,0 +1,40 @@
+from collections import OrderedDict
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.rate_limit import login_ip_limiter, login_username_limiter
+from app.main import app
+from tests.factories import add_user
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    """
+    A client with a fresh user limiter of 2 failed logins and no client IP limit.
+    """
+    monkeypatch.setattr(login_username_limiter, "burst", 2)
+    monkeypatch.setattr(login_username_limiter, "rate", 1 / 60)
+    monkeypatch.setattr(login_username_limiter, "_buckets", OrderedDict())
+    monkeypatch.setattr(login_ip_limiter, "rate", 0)
+    return TestClient(app)
+
+
+def login(client, username, password):
+    return client.post("/api/v1/token", data={"username": username, "password": password}).status_code
+
+
+def test_successful_logins_do_not_spend_the_user_budget(client, db):
+    add_user(db, "alice", password="secret")
+    assert [login(client, "alice", "secret") for _ in range(5)] == [200] * 5
+    assert login(client, "alice", "wrong") == 401
+
+
+def test_failed_logins_share_the_user_budget_across_username_and_email(client, db):
+    add_user(db, "alice", password="secret")
+    add_user(db, "bob", password="secret")
+    assert login(client, "alice", "wrong") == 401
+    assert login(client, "alice@example.com", "wrong") == 401
+    assert login(client, "alice@example.com", "secret") == 429
+    assert login(client, "alice", "secret") == 429
+    assert login(client, "bob", "secret") == 200
@@ -0,0 +1,26 @@
+from app.crud.role_index import RoleIndex
+
+
+def test_changes_applied_during_a_rebuild_are_kept():
+    index = RoleIndex()
+    index.set_roles([("u1", "s1", "reader"), ("u2", "s1", "reader")])
+
+    index.begin_rebuild()
+    # Read from the table before these changes were committed
+    snapshot = [("u1", "s1", "reader"), ("u2", "s1", "reader")]
+    index.set_roles([("u1", "s1", "admin"), ("u2", "s1", None)])
+    index.replace(snapshot)
+
+    assert index.get_role("u1", "s1") == "admin"
+    assert index.get_role("u2", "s1") is None
+    assert not index.stats()["rebuilding"]
+
+
+def test_rebuild_repairs_a_drift():
+    index = RoleIndex()
+    index.set_roles([("u1", "s1", "reader")])
+    index.begin_rebuild()
+    index.replace([("u1", "s2", "writer")])
+
+    assert index.get_role("u1", "s1") is None
+    assert index.get_role("u1", "s2") == "writer"
@@ -0,0 +1,40 @@
+import logging
+
+from sqlalchemy import create_engine, text
+
+from app.core.settings import settings
+from app.core.sql_instrumentation import describe_parameters, instrument_sql, slow_query_logger
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def test_describe_parameters_keeps_only_names_and_types():
+    assert describe_parameters({"username": "alice", "hashed_password": "$2b$12$secret"}) == (
+        "{username: str, hashed_password: str}"
+    )
+    assert describe_parameters(("alice", 3, None)) == "(str, int, NoneType)"
+    assert describe_parameters([("alice", "secret"), ("bob", "secret")]) == "2 rows of (str, str)"
+
+
+def test_slow_query_log_leaves_the_values_out(monkeypatch):
+    monkeypatch.setattr(settings, "SQL_SLOW_QUERY_MS", 0)
+    handler = ListHandler()
+    slow_query_logger.addHandler(handler)
+    engine = create_engine("sqlite://")
+    instrument_sql(engine, "test")
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT :token AS token"), {"token": "refresh-token-secret"})
+    finally:
+        slow_query_logger.removeHandler(handler)
+        engine.dispose()
+    assert handler.messages
+    assert "parameters: (str)" in handler.messages[-1]
+    assert not any("refresh-token-secret" in message for message in handler.messages)
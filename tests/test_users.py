@@ -0,0 +1,90 @@
+import asyncio
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from app.core.settings import settings
+from app.crud import UserRepository
+from tests.factories import add_service, add_user
+
+
+def test_list_users_pages_through_the_users(db, admin_client):
+    service = add_service(db, "core")
+    alice = add_user(db, "alice", [(service, "admin")])
+    add_user(db, "bob")
+
+    response = admin_client.get("/api/v1/users/", params={"limit": 1})
+    assert response.status_code == 200, response.text
+    page = response.json()
+    assert [user["username"] for user in page["items"]] == ["alice"]
+    assert uuid.UUID(page["items"][0]["id"]) == alice.id
+    role = page["items"][0]["roles"][0]
+    assert role["role"] == "admin"
+    assert uuid.UUID(role["service_id"]) == service.id
+    assert role["service"] == {"name": "core", "id": str(service.id)}
+
+    response = admin_client.get("/api/v1/users/", params={"limit": 1, "cursor": page["next_cursor"]})
+    assert response.status_code == 200, response.text
+    assert [user["username"] for user in response.json()["items"]] == ["bob"]
+
+
+def search(client, q, **params):
+    response = client.get("/api/v1/users/search", params={"q": q, **params})
+    assert response.status_code == 200, response.text
+    page = response.json()
+    return [user["username"] for user in page["items"]], page["next_cursor"]
+
+
+def test_search_users_by_prefix_and_substring(db, admin_client):
+    service = add_service(db, "core")
+    alice = add_user(db, "alice", [(service, "admin")])
+    for username in ("Alicia", "bob", "Malice"):
+        add_user(db, username)
+
+    response = admin_client.get("/api/v1/users/search", params={"q": "ALI"})
+    assert response.status_code == 200, response.text
+    items = response.json()["items"]
+    assert [user["username"] for user in items] == ["alice", "Alicia"]
+    assert uuid.UUID(items[0]["id"]) == alice.id
+    assert items[0]["roles"][0]["service"] == {"name": "core", "id": str(service.id)}
+
+    assert search(admin_client, "lic", mode="contains") == (["alice", "Alicia", "Malice"], None)
+    assert search(admin_client, "bob@", field="email", mode="contains") == (["bob"], None)
+    usernames, cursor = search(admin_client, "lic", mode="contains", limit=2)
+    assert usernames == ["alice", "Alicia"]
+    assert search(admin_client, "lic", mode="contains", limit=2, cursor=cursor) == (["Malice"], None)
+
+
+def test_search_refuses_short_or_too_broad_substrings(db, admin_client, monkeypatch):
+    for username in ("alice", "bob", "carol"):
+        add_user(db, username)
+
+    response = admin_client.get("/api/v1/users/search", params={"q": "al", "mode": "contains"})
+    assert response.status_code == 400
+    monkeypatch.setattr(settings, "USER_SEARCH_MAX_CANDIDATES", 2)
+    response = admin_client.get("/api/v1/users/search", params={"q": "example", "field": "email", "mode": "contains"})
+    assert response.status_code == 400
+    assert "more than 2 users" in response.json()["detail"]
+    assert search(admin_client, "ali", mode="contains") == (["alice"], None)
+
+
+def test_export_returns_the_next_updated_since_with_an_overlap(db, admin_client):
+    add_user(db, "alice")
+    started = datetime.now(timezone.utc)
+
+    response = admin_client.get("/api/v1/users/export")
+    assert response.status_code == 200, response.text
+    assert [json.loads(line)["username"] for line in response.text.splitlines()] == ["alice"]
+    next_updated_since = datetime.fromisoformat(response.headers["x-next-updated-since"])
+    assert started - next_updated_since >= timedelta(minutes=4)
+
+
+def test_password_rehash_keeps_the_export_watermark(db):
+    alice = add_user(db, "alice")
+    alice.updated_at = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    db.commit()
+
+    assert asyncio.run(UserRepository(db).update_password_hash(alice.id, "not-a-hash", "new-hash"))
+    db.expire_all()
+    assert alice.hashed_password == "new-hash"
+    assert alice.updated_at.replace(tzinfo=timezone.utc) == datetime(2020, 1, 1, tzinfo=timezone.utc)